@@ -0,0 +1 @@
+"""Code shared by the DexonicBot bots."""
@@ -0,0 +1,176 @@
+"""
+Instrumented OpenAI chat completions, shared by signal-bot and sentiment-bot.
+
+chat_completion() wraps client.chat.completions.create for every call site:
+it applies a per-call deadline, refuses calls once the daily token budget is
+spent, and records latency, time to first token (streams), prompt/completion
+tokens, errors, cache hits and calls answered locally instead (e.g. the local
+intent classifier) per call site in LLM_METRICS. Counters and the budget are
+per process.
+"""
+import os
+import math
+import time
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds before a completion request, streamed answer included, is abandoned (call sites may pass their own).
+# Clients should be built with max_retries=0, or the SDK retries each request within the call.
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+# Prompt + completion tokens allowed per UTC day across all call sites; 0 disables the budget
+LLM_DAILY_TOKEN_BUDGET = int(os.getenv("LLM_DAILY_TOKEN_BUDGET", 0))
+
+# Latencies kept per call site for percentiles
+LATENCY_SAMPLES = 1000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, or None without values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class BudgetExceeded(Exception):
+    """The daily token budget is spent"""
+
+
+class LLMMetrics:
+    def __init__(self, daily_token_budget=LLM_DAILY_TOKEN_BUDGET):
+        self.daily_token_budget = daily_token_budget
+        self.lock = threading.Lock()
+        self.sites = defaultdict(lambda: {
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "cache_hits": 0,
+            "local": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency": deque(maxlen=LATENCY_SAMPLES),
+            "first_token": deque(maxlen=LATENCY_SAMPLES),
+        })
+        self.day = None
+        self.day_tokens = 0
+
+    def tokens_today(self):
+        today = datetime.now(timezone.utc).date()
+        if self.day != today:
+            self.day, self.day_tokens = today, 0
+        return self.day_tokens
+
+    def check_budget(self, site):
+        with self.lock:
+            if self.daily_token_budget and self.tokens_today() >= self.daily_token_budget:
+                raise BudgetExceeded(f"Daily LLM token budget of {self.daily_token_budget} reached ({site})")
+
+    def record(self, site, latency, usage=None, first_token=None, error=None, timeout=False):
+        with self.lock:
+            stats = self.sites[site]
+            stats["calls"] += 1
+            stats["latency"].append(latency)
+            if first_token is not None:
+                stats["first_token"].append(first_token)
+            if error is not None:
+                stats["errors"] += 1
+            if timeout:
+                stats["timeouts"] += 1
+            if usage is not None:
+                stats["prompt_tokens"] += usage.prompt_tokens or 0
+                stats["completion_tokens"] += usage.completion_tokens or 0
+                self.tokens_today()
+                self.day_tokens += (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+
+    def cache_hit(self, site):
+        """A call avoided at `site` by reusing an earlier answer (response cache, reused summary)"""
+        with self.lock:
+            self.sites[site]["cache_hits"] += 1
+
+    def local(self, site):
+        """A call avoided at `site` by answering without the LLM (local intent classifier)"""
+        with self.lock:
+            self.sites[site]["local"] += 1
+
+    def snapshot(self):
+        """{site: counters and latency percentiles (seconds)} plus today's token total"""
+        with self.lock:
+            result = {}
+            for site, stats in self.sites.items():
+                row = {key: value for key, value in stats.items() if not isinstance(value, deque)}
+                for key in ("latency", "first_token"):
+                    row[f"{key}_p50"] = percentile(stats[key], 50)
+                    row[f"{key}_p95"] = percentile(stats[key], 95)
+                result[site] = row
+            return {"sites": result, "tokens_today": self.tokens_today(), "daily_token_budget": self.daily_token_budget}
+
+    def render(self):
+        snapshot = self.snapshot()
+        budget = snapshot["daily_token_budget"] or "unlimited"
+        lines = [f"LLM tokens today: {snapshot['tokens_today']} / {budget}"]
+        for site, row in sorted(snapshot["sites"].items()):
+            line = (
+                f"{site}: {row['calls']} calls, {row['cache_hits']} cache hits, {row['local']} local, {row['errors']} errors "
+                f"({row['timeouts']} timeouts), tokens {row['prompt_tokens']} in / {row['completion_tokens']} out"
+            )
+            if row["latency_p50"] is not None:
+                line += f", latency p50 {row['latency_p50']:.2f}s p95 {row['latency_p95']:.2f}s"
+            if row["first_token_p50"] is not None:
+                line += f", first token p50 {row['first_token_p50']:.2f}s"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+LLM_METRICS = LLMMetrics()
+
+
+def is_timeout(error):
+    return type(error).__name__ in ("APITimeoutError", "TimeoutError", "ReadTimeout", "ConnectTimeout")
+
+
+def chat_completion(client, site, timeout=None, metrics=LLM_METRICS, **kwargs):
+    """client.chat.completions.create(**kwargs) with a timeout, the token budget and metrics for `site`.
+
+    With stream=True the chunks are passed through and the usage is requested in the last chunk; a stream
+    still running after `timeout` seconds is closed with a TimeoutError.
+    """
+    metrics.check_budget(site)
+    if kwargs.get("stream"):
+        kwargs.setdefault("stream_options", {"include_usage": True})
+
+    timeout = timeout or LLM_TIMEOUT
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(timeout=timeout, **kwargs)
+    except Exception as e:
+        metrics.record(site, time.perf_counter() - started, error=e, timeout=is_timeout(e))
+        raise
+
+    if kwargs.get("stream"):
+        return _instrumented_stream(response, site, started, started + timeout, metrics)
+    metrics.record(site, time.perf_counter() - started, getattr(response, "usage", None))
+    return response
+
+
+def _instrumented_stream(stream, site, started, deadline, metrics):
+    first_token = None
+    usage = None
+    try:
+        for chunk in stream:
+            if time.perf_counter() > deadline:
+                stream.close()
+                raise TimeoutError(f"{site}: no complete answer within {deadline - started:.0f}s")
+            if first_token is None and chunk.choices:
+                first_token = time.perf_counter() - started
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            yield chunk
+    except Exception as e:
+        metrics.record(site, time.perf_counter() - started, usage, first_token, error=e, timeout=is_timeout(e))
+        raise
+    metrics.record(site, time.perf_counter() - started, usage, first_token)
@@ -11,8 +11,13 @@ import tweepy
 import ast
 from sqlalchemy import create_engine, text
 from datetime import datetime, timedelta
+import sys
 import time
 
+# dexonic/ (code shared by the bots) lives in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dexonic.llm import LLM_METRICS, chat_completion
+
 load_dotenv()
 
 DB_USER = os.getenv("DB_USER")
@@ -25,7 +30,7 @@ DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB
 engine = create_engine(DATABASE_URL)
 
 openai_key = os.getenv("OPENAI_API_KEY")  
-openai_client = OpenAI(api_key=openai_key)
+openai_client = OpenAI(api_key=openai_key, max_retries=0)
 
 def insert_table_signal(symbol, timeframe, signal, score):
     unix_time = int(time.time())
@@ -94,7 +99,9 @@ class SentimentAnalyzer:
                     },
                 {"role": "user", "content": "\n".join(articles)}
             ]
-            response = openai_client.chat.completions.create(
+            response = chat_completion(
+                openai_client,
+                "sentiment.web",
                 model="gpt-4o-mini",
                 messages=messages
             )
@@ -159,7 +166,9 @@ class SentimentAnalyzer:
                 {"role": "user", "content": "\n".join(tweets)}
             ]
 
-            response = openai_client.chat.completions.create(
+            response = chat_completion(
+                openai_client,
+                "sentiment.x",
                 model="gpt-4o-mini",
                 messages=messages
             )
@@ -197,6 +206,7 @@ async def main():
 
     x_score = await analyzer.scrape_x_sentiment(token)
     print(f"X Sentiment (Twitter): {x_score:.2f}")
+    print(LLM_METRICS.render())
 
 if __name__ == "__main__":
     asyncio.run(main())
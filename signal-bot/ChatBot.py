@@ -1,37 +1,91 @@
 import os
-import json
-import pandas as pd
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, text
-from openai import OpenAI
+import sys
 from dotenv import load_dotenv
+from clients import get_engine, get_openai_client
+from intent import IntentClassifier
+from response_cache import ResponseCache
+from admission import normalize_question
+# dexonic/ (code shared by the bots) lives in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dexonic.llm import LLM_METRICS, chat_completion
+from prompt_data import candles_csv, summarize_candles
 
 load_dotenv()
 
-# Load Database credentials
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-
-
 support_coins = [
-     "ADAUSDT"
-    ] 
+    coin.strip() for coin in os.getenv("SIGNAL_SYMBOLS", "ADAUSDT").split(",") if coin.strip()
+    ]
+
+# Last :limit candles of every requested symbol in one round trip, newest first per symbol
+RECENT_CANDLES_SQL = """
+SELECT * FROM (
+    SELECT c.*, ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY open_time DESC) AS row_num
+    FROM proddb.f_coin_signal_1h c
+    WHERE symbol IN :symbols
+    AND open_time > UNIX_TIMESTAMP(now()) - 2592000  -- Last 30 days
+) ranked
+WHERE row_num <= :limit
+ORDER BY symbol, open_time DESC;
+"""
+_recent_candles_query = None
+
+
+def recent_candles_query():
+    """RECENT_CANDLES_SQL as a SQLAlchemy statement; sqlalchemy is only imported by the first query"""
+    global _recent_candles_query
+    if _recent_candles_query is None:
+        from sqlalchemy import text, bindparam
+
+        _recent_candles_query = text(RECENT_CANDLES_SQL).bindparams(bindparam("symbols", expanding=True))
+    return _recent_candles_query
+
+# Higher timeframes added to the prompt when a Resampler is available
+CHAT_TIMEFRAMES = ["4h", "1d"]
+TIMEFRAME_COLUMNS = ["open_time", "open", "high", "low", "close", "rsi14"]
+
+# Bump when the analysis prompt changes so cached answers built from the old prompt are not reused
+PROMPT_VERSION = 2
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 3600))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 256))
+# The intent call is short; give up on it sooner than on the analysis (LLM_TIMEOUT)
+LLM_CLASSIFY_TIMEOUT = float(os.getenv("LLM_CLASSIFY_TIMEOUT", 10))
 
 class ChatBot:
-    def __init__(self, api_key, client):
-        self.api_key = api_key
-        self.client = client
+    def __init__(self, client=None, candle_store=None, resampler=None, market_digest=None):
+        # OpenAI client; the shared one is created on first use when none is given
+        self._client = client
+        # Optional CandleStore serving recent candles from memory
+        self.candle_store = candle_store
+        # Optional Resampler deriving higher timeframe candles from the store
+        self.resampler = resampler
+        # Optional MarketDigest answering whole-market questions
+        self.market_digest = market_digest
+        # Resolves most messages locally; the LLM classifier is only used when it is unsure
+        self.intent_classifier = IntentClassifier([coin[:-4] if coin.endswith("USDT") else coin for coin in support_coins])
+        # Analyses keyed by (question, symbols, newest candle, prompt version): the same question within a candle is answered once
+        self.response_cache = ResponseCache(RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_openai_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
 
     def classify_user_intent(self, user_query):
 
-        completion = self.client.chat.completions.create(
+        classification = self.intent_classifier.classify(user_query)
+        if classification is not None:
+            LLM_METRICS.local("chat.classify")
+            return classification
+
+        completion = chat_completion(
+            self.client,
+            "chat.classify",
+            timeout=LLM_CLASSIFY_TIMEOUT,
             model="gpt-4o-mini",
             messages=[
                 {
@@ -61,23 +115,63 @@ class ChatBot:
         )
         return completion.choices[0].message.content.strip()
 
-    def fetch_real_time_data(self, db: Session, coins_list):
-        table = "proddb.f_coin_signal_1h"
+    def query_recent_candles(self, db, coins, limit=14):
+        """{coin: last `limit` candles, newest first} for every coin, from one database query"""
+        if db is None:
+            with get_engine().connect() as connection:
+                return self.query_recent_candles(connection, coins, limit)
+
+        import pandas as pd
+
+        result = db.execute(recent_candles_query(), {"symbols": list(coins), "limit": int(limit)})
+        df = pd.DataFrame(result.fetchall(), columns=result.keys()).drop(columns="row_num")
+        return {coin: candles.reset_index(drop=True) for coin, candles in df.groupby("symbol", sort=False)}
+
+    def fetch_real_time_data(self, db, coins_list):
         real_time_data = ""
 
         try:
+            # Serve from the in-memory candle store when the coin is cached, newest first like the query
+            recent = {}
             for coin in coins_list:
-                query = f"SELECT * FROM {table} WHERE symbol = '{coin}' ORDER BY open_time DESC LIMIT 14"
-                result = db.execute(text(query))
-                df = pd.DataFrame(result.fetchall(), columns=result.keys())
-                real_time_data += f"\n\n{coin}:\n"
-                real_time_data += df.to_string(index=False)
+                df = self.candle_store.tail(coin, 14) if self.candle_store is not None else None
+                if df is not None:
+                    recent[coin] = df.iloc[::-1]
+            missing = [coin for coin in coins_list if coin not in recent]
+            if missing:
+                recent.update(self.query_recent_candles(db, missing))
+
+            for coin in coins_list:
+                df = recent.get(coin)
+                if df is None:
+                    continue
+                candles = df.iloc[::-1]
+                indicators = self.candle_store.indicators(coin) if self.candle_store is not None else {}
+                real_time_data += f"\n\n{coin} 1h: {summarize_candles(candles, indicators)}\n"
+                real_time_data += candles_csv(candles)
+                for timeframe in CHAT_TIMEFRAMES if self.resampler is not None else []:
+                    candles = self.resampler.candles(coin, timeframe, n=6)
+                    if candles is not None:
+                        real_time_data += f"\n{coin} {timeframe} (last candle may still be forming): "
+                        real_time_data += summarize_candles(candles, candles.iloc[-1].to_dict()) + "\n"
+                        real_time_data += candles_csv(candles, TIMEFRAME_COLUMNS, timeframe)
         except Exception as e:
             print(f"Error fetching data: {e}")
             return None
         return real_time_data
 
-    def generate_detailed_response(self, user_query, db: Session):
+    def response_cache_key(self, user_query, coins_list):
+        """(normalized question, symbols, newest open_time, prompt version), or None when a coin is not in the candle store"""
+        if self.candle_store is None:
+            return None
+        coins = tuple(sorted(set(coins_list)))
+        newest = [self.candle_store.last_open_time(coin) for coin in coins]
+        if any(open_time is None for open_time in newest):
+            return None
+        return normalize_question(user_query), coins, tuple(int(open_time) for open_time in newest), PROMPT_VERSION
+
+    def generate_detailed_response(self, user_query, db=None, on_delta=None):
+        """Answer a chat message; with `on_delta` the analysis is streamed and on_delta(text so far) is called per chunk"""
 
         classification = self.classify_user_intent(user_query)
 
@@ -89,6 +183,9 @@ class ChatBot:
         classification = classification.upper()
 
         if "all" in classification.lower():
+            digest = self.market_digest.latest() if self.market_digest is not None else None
+            if digest:
+                return digest
             coins_list = ["XRPUSDT"]
             coins_str = "XRP"
         else:
@@ -100,6 +197,13 @@ class ChatBot:
             not_supported_string = ", ".join(not_supported)
             return f"Sorry, I don't have information on the following coins: {not_supported_string}. Check the '/list_coin' command for supported coins."
 
+        cache_key = self.response_cache_key(user_query, coins_list)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                LLM_METRICS.cache_hit("chat.analysis")
+                return cached
+
         real_time_data = self.fetch_real_time_data(db, coins_list)
         if not real_time_data:
             return "I couldn't retrieve market data at this time."
@@ -109,21 +213,33 @@ class ChatBot:
             Provide an analysis of the current market situation for {coins_str}. Include short-term trends, and key technical indicators.
             Is the symbol currently in a buying range, or should the user wait for a better entry point? Please provide an analysis based on the technical indicators provided, such as moving averages, RSI, and support/resistance levels.
             You should answer me in raw text format. The markdown format is not allowed.
-            Based on the following real-time data interval 1 day for the symbol with the open_time in GMT+7 timezone: \n
+            Based on the following real-time data: for each symbol a summary line and CSV of 1 hour candles (time in GMT+7), followed by 4 hour and 1 day candles derived from them when available: \n
             You have powerful knowledge about Cardano and ADA tokens. If the question about "what is Cardano", you should share your knowledge aout it. 
             If the question is "How to trade in Cardano", you should provide your knowledge to help.
             Response MUST be in 4-5 lines. 
         """
         sys_prompt += real_time_data
 
-        completion = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_query}
-            ]
-        )
-
-        return completion.choices[0].message.content.strip()
+        messages = [
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": user_query}
+        ]
+        if on_delta is None:
+            completion = chat_completion(self.client, "chat.analysis", model="gpt-4o-mini", messages=messages)
+            response = completion.choices[0].message.content.strip()
+        else:
+            response = ""
+            stream = chat_completion(self.client, "chat.analysis", model="gpt-4o-mini", messages=messages, stream=True)
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    response += delta
+                    on_delta(response)
+            response = response.strip()
+
+        # An empty answer is not worth repeating for the rest of the candle
+        if cache_key is not None and response:
+            self.response_cache.put(cache_key, response)
+        return response
 
 
@@ -0,0 +1,76 @@
+"""
+Admission control for chat questions.
+
+Identical questions in flight are merged onto one computation, the number of
+computations running at once is capped by a semaphore, and new work is
+rejected with a friendly message when a user already has too many questions
+pending or the global queue is full, so bursts do not degrade everyone's
+latency.
+"""
+import re
+import asyncio
+from collections import defaultdict
+
+
+class Rejected(Exception):
+    """Raised by AdmissionController.submit when a question is not accepted; str() is the user message"""
+
+
+def normalize_question(text):
+    """Key for coalescing: lowercase words without punctuation"""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class Job:
+    """One computation shared by every request asking the same question"""
+
+    def __init__(self):
+        self.task = None
+        self.text = ""  # partial streamed answer
+        self.queued = False  # had to wait for a free slot when submitted
+
+    def on_delta(self, text):
+        self.text = text
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=8, max_queued=50, per_user=2):
+        self.max_concurrent = max_concurrent
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # Jobs running or waiting for a slot beyond this are rejected
+        self.capacity = max_concurrent + max_queued
+        self.per_user = per_user
+        self.user_jobs = defaultdict(int)
+        self.in_flight = {}  # question key -> Job
+
+    def submit(self, user_id, question, compute):
+        """Job answering `question`: an in-flight one when the same question is pending, else a new one.
+
+        `compute(job)` is a coroutine function producing the answer; it runs once a slot is free.
+        """
+        key = normalize_question(question)
+        job = self.in_flight.get(key)
+        if job is not None:
+            return job
+
+        if self.user_jobs[user_id] >= self.per_user:
+            raise Rejected("You already have questions in progress, please wait for their answers.")
+        if len(self.in_flight) >= self.capacity:
+            raise Rejected("I'm handling a lot of questions right now, please try again in a minute.")
+
+        job = Job()
+        job.queued = len(self.in_flight) >= self.max_concurrent
+        self.in_flight[key] = job
+        self.user_jobs[user_id] += 1
+        job.task = asyncio.ensure_future(self.run(job, key, user_id, compute))
+        return job
+
+    async def run(self, job, key, user_id, compute):
+        try:
+            async with self.semaphore:
+                return await compute(job)
+        finally:
+            del self.in_flight[key]
+            self.user_jobs[user_id] -= 1
+            if not self.user_jobs[user_id]:
+                del self.user_jobs[user_id]
@@ -0,0 +1,240 @@
+"""
+Parameter-sweep backtester for the TradeBot patterns.
+
+Loads candles once (MySQL or CSV), writes every column to a memory-mapped .npy
+file shared by all workers, then evaluates a grid (or random sample) of detector
+parameters over symbols and date periods on a process pool, and writes a ranked
+results table.
+
+Usage:
+    python backtest.py --symbols ADAUSDT,BTCUSDT --start 2024-01-01 --end 2025-01-01 \
+        --param "Fourth Signal.run_length=2,3,4" --param "Fourth Signal.rsi_upper=60:80:5" \
+        --periods 4 --workers 8 --output backtest_results.csv
+
+Add --timeframe 4h (or 1d, 1w) to run the detectors on candles resampled from the 1h data.
+"""
+import os
+import random
+import argparse
+import itertools
+import tempfile
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from detectors import HORIZONS, PATTERNS, scan_arrays
+from forward_returns import signal_stats
+from resample import TIMEFRAMES, resample_history
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "rsi7"]
+
+CANDLE_QUERY = """
+SELECT symbol, open_time, open, high, low, close, rsi7 FROM f_coin_signal_1h
+WHERE symbol IN :symbols
+AND open_time >= :start AND open_time < :end
+ORDER BY symbol, open_time ASC;
+"""
+
+# Set in each worker by init_worker
+SHARED = {}
+
+
+def load_candles(args):
+    """Load candles for the requested symbols and date range from CSV or the database"""
+    start = int(datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc).timestamp()) if args.start else 0
+    end = int(datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc).timestamp()) if args.end else 2 ** 62
+
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        if args.symbols:
+            df = df[df["symbol"].isin(args.symbols)]
+        df = df[(df["open_time"] >= start) & (df["open_time"] < end)]
+        return df.sort_values(["symbol", "open_time"], kind="stable").reset_index(drop=True)
+
+    from sqlalchemy import text, bindparam
+    from clients import get_engine
+
+    query = text(CANDLE_QUERY).bindparams(bindparam("symbols", expanding=True))
+    return pd.read_sql(query, get_engine(), params={"symbols": args.symbols, "start": start, "end": end})
+
+
+def share_candles(df, data_dir):
+    """Write candle columns to .npy files and return {symbol: (first_row, end_row)} segments"""
+    np.save(os.path.join(data_dir, "open_time.npy"), df["open_time"].to_numpy(dtype=np.int64))
+    for column in PRICE_COLUMNS:
+        np.save(os.path.join(data_dir, f"{column}.npy"), df[column].to_numpy(dtype=np.float64))
+
+    symbols = df["symbol"].to_numpy()
+    boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+    starts = np.r_[0, boundaries]
+    ends = np.r_[boundaries, len(df)]
+    return {symbols[a]: (int(a), int(b)) for a, b in zip(starts, ends)}
+
+
+def init_worker(data_dir):
+    """Open the shared candle columns read-only; pages are shared with every other worker"""
+    SHARED["open_time"] = np.load(os.path.join(data_dir, "open_time.npy"), mmap_mode="r")
+    for column in PRICE_COLUMNS:
+        SHARED[column] = np.load(os.path.join(data_dir, f"{column}.npy"), mmap_mode="r")
+
+
+def parse_values(spec):
+    """'2,3,4' -> [2, 3, 4]; '60:80:5' -> [60, 65, 70, 75, 80]"""
+    def number(value):
+        return int(value) if value.lstrip("-").isdigit() else float(value)
+
+    if ":" in spec:
+        start, stop, step = (number(part) for part in spec.split(":"))
+        return [number(f"{v:g}") for v in np.arange(start, stop + step / 2, step)]
+    return [number(value) for value in spec.split(",")]
+
+
+def build_configs(param_specs, patterns, samples=None, seed=0):
+    """Expand 'Pattern.param=values' specs into a list of {pattern: {param: value}} configs"""
+    axes = []
+    for spec in param_specs:
+        key, values = spec.split("=", 1)
+        pattern, param = key.rsplit(".", 1)
+        if pattern not in PATTERNS:
+            raise ValueError(f"Unknown pattern '{pattern}', registered: {', '.join(PATTERNS)}")
+        if param not in PATTERNS[pattern]["params"]:
+            raise ValueError(f"Unknown parameter '{param}' for {pattern}")
+        axes.append(((pattern, param), parse_values(values)))
+
+    grid = list(itertools.product(*(values for _, values in axes)))
+    if samples and samples < len(grid):
+        grid = random.Random(seed).sample(grid, samples)
+
+    configs = []
+    for values in grid:
+        config = {pattern: {} for pattern in patterns}
+        for ((pattern, param), _), value in zip(axes, values):
+            config.setdefault(pattern, {})[param] = value
+        configs.append(config)
+    return configs
+
+
+def run_task(task):
+    """Evaluate one parameter config on a group of symbols over one period"""
+    config, patterns, horizons, segments, period = task
+    times = SHARED["open_time"]
+    histories = []
+    for symbol, (first, end) in segments.items():
+        # Restrict the symbol's rows to the period with a binary search on open_time
+        first, end = first + np.searchsorted(times[first:end], period[0]), first + np.searchsorted(times[first:end], period[1])
+        if end - first < 2:
+            continue
+        candles = {column: SHARED[column][first:end] for column in PRICE_COLUMNS}
+        _, history = scan_arrays(
+            candles, times[first:end], symbol, {name: PATTERNS[name] for name in patterns}, config, horizons
+        )
+        histories.append(history)
+
+    history = pd.concat(histories, ignore_index=True) if histories else pd.DataFrame()
+    rows = []
+    for name in patterns:
+        signals = history[history["pattern"] == name] if not history.empty else history
+        stats = signal_stats(signals, horizons) if not signals.empty else None
+        for horizon in horizons:
+            row = {
+                "pattern": name,
+                **{f"{name}.{param}": value for param, value in {**PATTERNS[name]["params"], **config.get(name, {})}.items()},
+                "symbols": ",".join(segments) if len(segments) <= 3 else f"{len(segments)} symbols",
+                "period_start": datetime.fromtimestamp(period[0], tz=timezone.utc).date().isoformat(),
+                "period_end": datetime.fromtimestamp(period[1], tz=timezone.utc).date().isoformat(),
+                "horizon": horizon,
+            }
+            if stats is not None:
+                row.update(stats.loc[horizon].to_dict())
+            else:
+                row["signals"] = 0
+            rows.append(row)
+    return rows
+
+
+def results_frame(rows):
+    """Rows as a DataFrame; integer parameters stay integers although rows of other patterns leave gaps"""
+    results = pd.DataFrame(rows)
+    for column in [column for column in results.columns if "." in column]:
+        values = [row[column] for row in rows if column in row]
+        if all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in values):
+            results[column] = results[column].astype("Int64")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep TradeBot pattern parameters over symbols and date ranges")
+    parser.add_argument("--symbols", type=lambda s: [x.strip() for x in s.split(",") if x.strip()], default=None,
+                        help="comma separated symbols (default: all in CSV / SIGNAL_SYMBOLS)")
+    parser.add_argument("--start", help="start date (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", help="end date (YYYY-MM-DD, UTC, exclusive)")
+    parser.add_argument("--csv", help="read candles from a CSV export instead of the database")
+    parser.add_argument("--timeframe", default="1h", choices=list(TIMEFRAMES),
+                        help="run the detectors on candles resampled from the 1h data")
+    parser.add_argument("--patterns", default=",".join(PATTERNS), help="comma separated pattern names")
+    parser.add_argument("--param", action="append", default=[],
+                        help="'Pattern.param=v1,v2' or 'Pattern.param=start:stop:step', repeatable")
+    parser.add_argument("--samples", type=int, help="random search: evaluate this many configs sampled from the grid")
+    parser.add_argument("--horizons", type=lambda s: [int(x) for x in s.split(",")], default=HORIZONS)
+    parser.add_argument("--periods", type=int, default=1, help="split the date range into this many periods")
+    parser.add_argument("--per-symbol", action="store_true", help="evaluate each symbol separately")
+    parser.add_argument("--rank-by", default="win_rate_low",
+                        choices=["win_rate", "win_rate_low", "mean_return", "mean_return_low", "median_return"])
+    parser.add_argument("--min-signals", type=int, default=10, help="rank only rows with at least this many signals")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="backtest_results.csv")
+    args = parser.parse_args()
+
+    if args.symbols is None and not args.csv:
+        args.symbols = [s.strip() for s in os.getenv("SIGNAL_SYMBOLS", "ADAUSDT").split(",") if s.strip()]
+    patterns = [name.strip() for name in args.patterns.split(",")]
+
+    df = load_candles(args)
+    if df.empty:
+        print("No candles found!")
+        return
+    print(f"Loaded {len(df)} candles for {df['symbol'].nunique()} symbols")
+    if args.timeframe != "1h":
+        df = resample_history(df, args.timeframe)
+        print(f"Resampled to {len(df)} {args.timeframe} candles")
+
+    configs = build_configs(args.param, patterns, args.samples, args.seed)
+    edges = np.linspace(df["open_time"].min(), df["open_time"].max() + 1, args.periods + 1).astype(np.int64)
+    periods = list(zip(edges[:-1], edges[1:]))
+
+    with tempfile.TemporaryDirectory(prefix="backtest-") as data_dir:
+        segments = share_candles(df, data_dir)
+        groups = [{symbol: segment} for symbol, segment in segments.items()] if args.per_symbol else [segments]
+        tasks = [
+            (config, patterns, args.horizons, group, period)
+            for config in configs for group in groups for period in periods
+        ]
+        print(f"Running {len(tasks)} tasks ({len(configs)} configs) on {args.workers} workers...")
+
+        rows = []
+        started = datetime.now()
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(data_dir,)) as pool:
+            for task_rows in pool.map(run_task, tasks, chunksize=max(1, len(tasks) // (args.workers * 4))):
+                rows.extend(task_rows)
+        elapsed = (datetime.now() - started).total_seconds()
+
+    results = results_frame(rows)
+    if args.rank_by not in results:
+        results[args.rank_by] = np.nan
+    eligible = results["signals"] >= args.min_signals
+    results["rank"] = results[args.rank_by].where(eligible).rank(ascending=False, method="min")
+    results = results.sort_values(["rank", "signals"], ascending=[True, False], na_position="last")
+    param_columns = [column for column in results.columns if "." in column]
+    leading = ["rank", "pattern", *param_columns, "symbols", "period_start", "period_end", "horizon", "signals"]
+    results = results[leading + [column for column in results.columns if column not in leading]]
+    results.to_csv(args.output, index=False)
+
+    print(f"Evaluated {len(tasks)} tasks in {elapsed:.1f}s, results written to {args.output}")
+    print(results.head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
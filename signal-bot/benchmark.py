@@ -0,0 +1,309 @@
+"""
+Benchmark of the TradeBot analytics on synthetic candles.
+
+Generates a reproducible OHLCV + rsi7 series per size, times every analytics
+stage (best of --repeat runs), measures its peak traced memory in a separate
+run, and checks a digest of each stage's output against benchmark_golden.json
+so optimizations can be shown to keep results identical.
+
+The golden digests only pin the current engine. --baseline additionally runs
+the original row-by-row scanners (collect_outside_bar_signals and
+collect_fourth_signals, kept below) on sizes up to --baseline-max-rows and
+checks that scan_candles finds the same signals with the same prices and
+profits.
+
+Usage:
+    python benchmark.py                           # 1k, 10k, 100k, 1M and 10M rows
+    python benchmark.py --sizes 1000,100000 --stages scan_candles,analyze_historical_performance
+    python benchmark.py --sizes 1000,10000 --baseline
+    python benchmark.py --update-golden           # after an intended change of results
+"""
+import os
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from detectors import HORIZONS, PATTERNS, scan_candles
+from forward_returns import signal_stats
+from indicators import add_indicators
+from resample import resample_history
+from synthetic import make_candles
+from tradebot import TradeBot
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_golden.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Candles fed one at a time after seeding, like the hourly job
+INCREMENTAL_CANDLES = 24
+# The baseline scanners walk rows with iloc (~50k rows/s), so they only run on small sizes
+BASELINE_MAX_ROWS = 20_000
+
+
+def new_trade_bot():
+    # No message is sent, so the token only has to be well formed
+    return TradeBot("0:benchmark", None)
+
+
+def digest_history(history):
+    digest = {"signals": len(history)}
+    for name in PATTERNS:
+        signals = history[history["pattern"] == name]
+        digest[name] = {
+            "signals": len(signals),
+            **{f"profit_{h}": float(signals[f"profit_{h}"].sum()) for h in HORIZONS},
+            **{f"mae_{h}": float(signals[f"mae_{h}"].sum()) for h in HORIZONS},
+        }
+    return digest
+
+
+def digest_results(results):
+    return {
+        name: {
+            "total_signals": int(result["total_signals"]),
+            **{f"win_rate_{h}": float(rate) for h, rate in result["win_rates"].items()},
+        }
+        for name, result in results.items()
+    }
+
+
+# Baseline scanners: the original TradeBot loops, kept to check scan_candles against
+
+def baseline_outside_bar_signals(df):
+    signals = []
+    for i in range(1, len(df) - 6):
+        prev_candle = df.iloc[i - 1]
+        current_candle = df.iloc[i]
+        next_candle_1 = df.iloc[i + 1]
+        exits = {h: df.iloc[i + h] for h in HORIZONS}
+
+        if not (current_candle["high"] > prev_candle["high"] and current_candle["low"] < prev_candle["low"]):
+            continue
+        if current_candle["close"] > current_candle["open"] and prev_candle["close"] < prev_candle["open"]:
+            order = "BUY"
+        elif current_candle["close"] < current_candle["open"] and prev_candle["close"] > prev_candle["open"]:
+            order = "SELL"
+        else:
+            continue
+
+        entry = next_candle_1["open"]
+        signal = {"time": current_candle["open_time"], "order": order, "entry_price": entry}
+        for h, candle in exits.items():
+            signal[f"exit_price_{h}"] = candle["close"]
+            move = (candle["close"] - entry) / entry * 100
+            signal[f"profit_{h}"] = move if order == "BUY" else -move
+        signals.append(signal)
+    return pd.DataFrame(signals)
+
+
+def baseline_fourth_signals(df):
+    signals = []
+    for i in range(3, len(df) - 6):
+        previous = [df.iloc[i - 3], df.iloc[i - 2], df.iloc[i - 1]]
+        signal_candle = df.iloc[i]
+        exits = {h: df.iloc[i + h] for h in HORIZONS}
+
+        if all(c["open"] < c["close"] for c in previous) and all(c["rsi7"] > 70 for c in previous):
+            order = "SELL"
+        elif all(c["open"] > c["close"] for c in previous) and all(c["rsi7"] < 30 for c in previous):
+            order = "BUY"
+        else:
+            continue
+
+        entry = signal_candle["open"]
+        signal = {"time": signal_candle["open_time"], "order": order, "entry_price": entry}
+        for h, candle in exits.items():
+            signal[f"exit_price_{h}"] = candle["close"]
+            move = (candle["close"] - entry) / entry * 100
+            signal[f"profit_{h}"] = move if order == "BUY" else -move
+        signals.append(signal)
+    return pd.DataFrame(signals)
+
+
+BASELINE_SCANNERS = {"Outside Bar": baseline_outside_bar_signals, "Fourth Signal": baseline_fourth_signals}
+
+
+def check_baseline(candles):
+    """Names of the patterns whose scan_candles history differs from the baseline scanner"""
+    history = scan_candles(candles)[1]
+    columns = ["entry_price"] + [f"{kind}_{h}" for kind in ("exit_price", "profit") for h in HORIZONS]
+    mismatches = []
+    for name, scanner in BASELINE_SCANNERS.items():
+        expected = scanner(candles)
+        actual = history[history["pattern"] == name]
+        if expected.empty or actual.empty:
+            if len(expected) != len(actual):
+                mismatches.append(name)
+            continue
+        expected = expected.sort_values(["time", "order"], ignore_index=True)
+        actual = actual.sort_values(["time", "order"], ignore_index=True)
+        same = (
+            len(expected) == len(actual)
+            and (expected["time"].to_numpy() == actual["time"].to_numpy()).all()
+            and (expected["order"].to_numpy() == actual["order"].to_numpy()).all()
+            and np.allclose(expected[columns].to_numpy(dtype=float), actual[columns].to_numpy(dtype=float), rtol=1e-9)
+        )
+        if not same:
+            mismatches.append(name)
+    return mismatches
+
+
+# Each stage: setup(candles) -> args (untimed), run(*args) -> digest (timed)
+
+def setup_history(candles):
+    return (scan_candles(candles)[1],)
+
+
+def setup_win_rates(candles):
+    return new_trade_bot(), scan_candles(candles)[1]
+
+
+def run_win_rates(bot, history):
+    digest = {}
+    for name in PATTERNS:
+        win_rates, total = bot.calculate_win_rates_by_candle(history[history["pattern"] == name])
+        digest[name] = {"total": total, **{str(h): float(rate) for h, rate in win_rates.items()}}
+    return digest
+
+
+def run_signal_stats(history):
+    stats = signal_stats(history, HORIZONS)
+    return {column: [float(v) for v in stats[column]] for column in ("signals", "win_rate", "mean_return", "median_return")}
+
+
+def run_indicators(candles):
+    df = add_indicators(candles)
+    return {column: float(np.nansum(df[column])) for column in ("rsi14", "ema20", "sma50", "atr14", "bb_upper")}
+
+
+def run_analyze(bot, candles):
+    return digest_results(bot.analyze_historical_performance(candles))
+
+
+def setup_incremental(candles):
+    bot = new_trade_bot()
+    bot.update_historical_performance(candles.iloc[:-INCREMENTAL_CANDLES])
+    return bot, candles.iloc[-INCREMENTAL_CANDLES:]
+
+
+def run_incremental(bot, new_candles):
+    for i in range(len(new_candles)):
+        bot.update_historical_performance(new_candles.iloc[i:i + 1])
+    return digest_results(bot.results["SYNTHUSDT"])
+
+
+def run_resample(candles):
+    df = resample_history(candles, "1d")
+    return {"candles": len(df), "close": float(df["close"].sum()), "rsi7": float(np.nansum(df["rsi7"]))}
+
+
+STAGES = {
+    "indicators": (lambda candles: (candles,), run_indicators),
+    "scan_candles": (lambda candles: (candles,), lambda candles: digest_history(scan_candles(candles)[1])),
+    "win_rates": (setup_win_rates, run_win_rates),
+    "signal_stats": (setup_history, run_signal_stats),
+    "analyze_historical_performance": (lambda candles: (new_trade_bot(), candles.copy()), run_analyze),
+    "incremental_update": (setup_incremental, run_incremental),
+    "resample_1d": (lambda candles: (candles,), run_resample),
+}
+
+# Rows processed by a stage when it is not the whole series
+STAGE_ROWS = {"incremental_update": lambda size: INCREMENTAL_CANDLES}
+
+
+def measure(setup, run, candles, repeat):
+    """(best seconds, peak traced bytes, digest) of one stage"""
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup(candles)
+        gc.collect()
+        started = time.perf_counter()
+        digest = run(*args)
+        best = min(best, time.perf_counter() - started)
+
+    args = setup(candles)
+    gc.collect()
+    tracemalloc.start()
+    run(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, digest
+
+
+def matches(actual, expected, rel=1e-9):
+    """Compare digests, floats within a relative tolerance"""
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and actual.keys() == expected.keys() and all(
+            matches(actual[key], expected[key], rel) for key in expected
+        )
+    if isinstance(expected, list):
+        return isinstance(actual, list) and len(actual) == len(expected) and all(
+            matches(a, e, rel) for a, e in zip(actual, expected)
+        )
+    if isinstance(expected, float):
+        return (np.isnan(expected) and np.isnan(actual)) or bool(np.isclose(actual, expected, rtol=rel, atol=1e-9))
+    return actual == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TradeBot analytics stages on synthetic candles")
+    parser.add_argument("--sizes", type=lambda s: [int(float(x)) for x in s.split(",")], default=DEFAULT_SIZES,
+                        help="comma separated row counts (e.g. 1000,1e6)")
+    parser.add_argument("--stages", type=lambda s: s.split(","), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden digests with these results")
+    parser.add_argument("--baseline", action="store_true", help="also compare scan_candles with the original scanners")
+    parser.add_argument("--baseline-max-rows", type=int, default=BASELINE_MAX_ROWS,
+                        help="largest size the baseline comparison runs on")
+    args = parser.parse_args()
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+
+    failures = 0
+    print(f"{'rows':>10} {'stage':<32} {'best (s)':>10} {'rows/s':>14} {'peak MB':>10}  golden")
+    for size in args.sizes:
+        candles = make_candles(size, args.seed)
+        key = f"{size}:{args.seed}"
+        if args.baseline and size <= args.baseline_max_rows:
+            mismatches = check_baseline(candles)
+            failures += len(mismatches)
+            status = f"MISMATCH ({', '.join(mismatches)})" if mismatches else "ok"
+            print(f"{size:>10} {'baseline scanners':<32} {'':>10} {'':>14} {'':>10}  {status}")
+        for stage in args.stages:
+            setup, run = STAGES[stage]
+            seconds, peak, digest = measure(setup, run, candles, args.repeat)
+            # Round trip through JSON so the comparison sees what the golden file stores
+            digest = json.loads(json.dumps(digest))
+
+            expected = golden.get(key, {}).get(stage)
+            if args.update_golden:
+                golden.setdefault(key, {})[stage] = digest
+                status = "updated"
+            elif expected is None:
+                status = "missing"
+            elif matches(digest, expected):
+                status = "ok"
+            else:
+                status = "MISMATCH"
+                failures += 1
+            rows = STAGE_ROWS.get(stage, lambda n: n)(size)
+            print(f"{size:>10} {stage:<32} {seconds:>10.4f} {rows / seconds:>14,.0f} {peak / 2 ** 20:>10.1f}  {status}")
+
+    if args.update_golden:
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(golden, f, indent=1, sort_keys=True)
+        print(f"Golden digests written to {GOLDEN_PATH}")
+    if failures:
+        raise SystemExit(f"{failures} stage(s) differ from the golden or baseline results")
+
+
+if __name__ == "__main__":
+    main()
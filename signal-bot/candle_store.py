@@ -0,0 +1,171 @@
+"""
+In-process candle cache for f_coin_signal_1h.
+
+Each symbol's candles live in fixed-capacity columnar NumPy ring buffers.
+CandleStore.refresh() pulls only rows newer than what is cached (one query for
+every symbol), so the signal job and the chat handler can both read recent
+candles without a database round trip. Locally computed indicators (indicators.py)
+are updated once per new candle as it is ingested.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+
+from clients import get_engine
+from indicators import IndicatorSet
+
+# Rows newer than the cached ones for every symbol, never older than the last 30 days
+REFRESH_QUERY = text("""
+SELECT * FROM f_coin_signal_1h
+WHERE symbol IN :symbols
+AND open_time > GREATEST(:since, UNIX_TIMESTAMP(now()) - 2592000)  -- Last 30 days
+ORDER BY symbol, open_time ASC;
+""").bindparams(bindparam("symbols", expanding=True))
+
+
+# Ring column types, fixed when the ring is created so later batches are never cast to the first batch's
+# types; other numeric columns (indicators) are float64 and anything else (symbol) is stored as objects
+COLUMN_DTYPES = {
+    "open_time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+
+
+def column_dtype(name, values):
+    if name in COLUMN_DTYPES:
+        return COLUMN_DTYPES[name]
+    return np.float64 if pd.api.types.is_numeric_dtype(values) else object
+
+
+class CandleRing:
+    """Fixed-capacity columnar ring buffer holding one symbol's most recent candles"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = {}
+        self.start = 0
+        self.size = 0
+
+    @property
+    def last_open_time(self):
+        if self.size == 0:
+            return None
+        return self.columns["open_time"][(self.start + self.size - 1) % self.capacity]
+
+    def extend(self, df):
+        """Append candles (sorted by open_time); the oldest ones are overwritten when full"""
+        if df.empty:
+            return
+        if not self.columns:
+            for name in df.columns:
+                self.columns[name] = np.empty(self.capacity, dtype=column_dtype(name, df[name]))
+
+        df = df.iloc[-self.capacity:]
+        positions = (self.start + self.size + np.arange(len(df))) % self.capacity
+        for name, column in self.columns.items():
+            if name in df:
+                column[positions] = df[name].to_numpy(dtype=column.dtype)
+
+        self.size += len(df)
+        if self.size > self.capacity:
+            self.start = (self.start + self.size - self.capacity) % self.capacity
+            self.size = self.capacity
+
+    def tail(self, n):
+        """Last n candles, oldest first"""
+        n = min(n, self.size)
+        positions = (self.start + self.size - n + np.arange(n)) % self.capacity
+        return pd.DataFrame({name: column[positions] for name, column in self.columns.items()})
+
+
+class CandleStore:
+    """Per-symbol candle rings for f_coin_signal_1h, refreshed incrementally from the database"""
+
+    def __init__(self, engine, symbols, capacity=1024):
+        # None: the shared engine from clients.get_engine(), created on first refresh
+        self.engine = engine
+        self.symbols = list(symbols)
+        self.capacity = capacity
+        self.rings = {}
+        self.indicator_sets = {}
+        # Symbols queried at least once, even when no rows came back
+        self.loaded = set()
+        self.lock = threading.Lock()
+
+    def last_open_time(self, symbol):
+        ring = self.rings.get(symbol)
+        return ring.last_open_time if ring is not None else None
+
+    def refresh(self):
+        """Load rows newer than the cached ones for every symbol and return them (sorted by symbol, open_time)
+
+        Symbols never queried are backfilled (last 30 days) in their own query; a symbol without rows
+        is not backfilled again, so it cannot drag the incremental query back to the full window.
+        """
+        engine = self.engine if self.engine is not None else get_engine()
+        frames = []
+
+        new_symbols = [symbol for symbol in self.symbols if symbol not in self.loaded]
+        if new_symbols:
+            frames.append(pd.read_sql(REFRESH_QUERY, engine, params={"symbols": new_symbols, "since": 0}))
+
+        loaded = [symbol for symbol in self.symbols if symbol in self.loaded]
+        if loaded:
+            times = [t for t in (self.last_open_time(symbol) for symbol in loaded) if t is not None]
+            since = min(times) if times else 0
+            frames.append(pd.read_sql(REFRESH_QUERY, engine, params={"symbols": loaded, "since": int(since)}))
+
+        self.loaded.update(new_symbols)
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return self.ingest(pd.concat(frames, ignore_index=True).sort_values(["symbol", "open_time"], ignore_index=True))
+
+    def ingest(self, df):
+        """Append candles of any symbols, skipping rows already cached; returns the rows that were new"""
+        if df.empty:
+            return df
+
+        new_rows = []
+        with self.lock:
+            for symbol, candles in df.groupby("symbol", sort=False):
+                ring = self.rings.setdefault(symbol, CandleRing(self.capacity))
+                if ring.last_open_time is not None:
+                    candles = candles[candles["open_time"] > ring.last_open_time]
+                ring.extend(candles)
+                indicators = self.indicator_sets.setdefault(symbol, IndicatorSet())
+                for high, low, close in candles[["high", "low", "close"]].itertuples(index=False):
+                    indicators.update(high, low, close)
+                new_rows.append(candles)
+        return pd.concat(new_rows, ignore_index=True) if new_rows else df.iloc[:0]
+
+    def tail(self, symbol, n):
+        """Last n candles of a symbol, oldest first, or None if the symbol is not cached"""
+        with self.lock:
+            ring = self.rings.get(symbol)
+            if ring is None or ring.size == 0:
+                return None
+            return ring.tail(n)
+
+    def since(self, symbol, open_time):
+        """Cached candles of a symbol with open_time >= `open_time` (all when None), oldest first"""
+        with self.lock:
+            ring = self.rings.get(symbol)
+            if ring is None or ring.size == 0:
+                return None
+            candles = ring.tail(ring.size)
+        if open_time is not None:
+            candles = candles[candles["open_time"] >= open_time].reset_index(drop=True)
+        return candles
+
+    def indicators(self, symbol):
+        """Latest locally computed indicators of a symbol ({} if the symbol is not cached)"""
+        with self.lock:
+            indicators = self.indicator_sets.get(symbol)
+            return dict(indicators.values) if indicators is not None else {}
@@ -0,0 +1,196 @@
+"""
+End-to-end chat load test, offline.
+
+Starts the fake OpenAI server (fake_openai.py) unless --base-url is given, loads
+a SQLite candle fixture (candle_fixture.py) as the shared database, and lets
+simulated Telegram users ask questions concurrently. Each question goes either
+through main.handle_message (admission control, streamed edits of the reply) or
+straight to ChatBot.generate_detailed_response on the LLM thread pool. Reports
+p50/p99 reply latency, time to the first message, throughput, rejected
+questions and the LLM metrics.
+
+Usage:
+    python chat_load_test.py --users 50 --questions 5 --latency 0.8 --token-delay 0.02
+    python chat_load_test.py --target generate --users 20 --no-cache
+    python chat_load_test.py --no-store       # every question queries the fixture database
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+QUESTIONS = [
+    "How is {coin} looking today?",
+    "What's your analysis on {coin}?",
+    "Should I buy {coin} now?",
+    "Is {coin} in a good entry range?",
+]
+
+
+class FakeMessage:
+    """Telegram message stand-in recording when replies are sent and edited"""
+
+    def __init__(self, text, conversation=None):
+        self.text = text
+        self.conversation = conversation
+
+    async def reply_text(self, text):
+        self.conversation.sent(text)
+        return FakeMessage(text, self.conversation)
+
+    async def edit_text(self, text):
+        self.text = text
+        self.conversation.edited(text)
+
+
+class Conversation:
+    """One question: when it was asked, first answered and finally answered"""
+
+    def __init__(self, user_id, text):
+        self.update = SimpleNamespace(message=FakeMessage(text, self), effective_user=SimpleNamespace(id=user_id))
+        self.started = time.perf_counter()
+        self.first_reply = None
+        self.finished = None
+        self.edits = 0
+        self.text = None
+
+    def sent(self, text):
+        if self.first_reply is None:
+            self.first_reply = time.perf_counter() - self.started
+        self.text = text
+
+    def edited(self, text):
+        self.edits += 1
+        self.text = text
+
+
+def percentiles(values):
+    if not values:
+        return "n/a"
+    p50, p99 = np.percentile(values, [50, 99])
+    return f"p50 {p50:.3f}s p99 {p99:.3f}s max {max(values):.3f}s"
+
+
+async def run_load(args, bot, coins):
+    """Every user asks `args.questions` questions with random think time; returns the conversations"""
+    rng = random.Random(args.seed)
+    conversations = []
+
+    async def ask(user_id, text):
+        conversation = Conversation(user_id, text)
+        conversations.append(conversation)
+        if args.target == "handler":
+            await bot.handle_message(conversation.update, None)
+        else:
+            try:
+                conversation.sent(await bot.run_blocking(bot.llm_executor, bot.chatbot.generate_detailed_response, text))
+                conversation.edits = 1
+            except Exception as e:
+                conversation.sent(f"Sorry, I couldn't process your request right now. ({e})")
+        conversation.finished = time.perf_counter() - conversation.started
+
+    async def user(user_id):
+        await asyncio.sleep(rng.uniform(0, args.ramp))
+        for _ in range(args.questions):
+            await ask(user_id, rng.choice(QUESTIONS).format(coin=rng.choice(coins)))
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+
+    await asyncio.gather(*(user(user_id) for user_id in range(args.users)))
+    return conversations
+
+
+def report(args, conversations, elapsed, bot):
+    # A rejected question gets one reply and no edit; an answered one ends with an edit of the placeholder
+    answered = [c for c in conversations if c.edits and not c.text.startswith("Sorry, I couldn't process")]
+    rejected = [c for c in conversations if not c.edits]
+    errors = len(conversations) - len(answered) - len(rejected)
+    target = "handle_message" if args.target == "handler" else "generate_detailed_response"
+    cache = bot.chatbot.response_cache
+
+    print(f"{target}: {len(conversations)} questions from {args.users} users in {elapsed:.2f}s")
+    print(f"answered {len(answered)}, rejected {len(rejected)}, errors {errors}")
+    print(f"reply latency {percentiles([c.finished for c in answered])}")
+    if args.target == "handler":
+        print(f"first message {percentiles([c.first_reply for c in answered])}")
+    print(f"throughput {len(answered) / elapsed:.2f} answers/s")
+    print(f"response cache {cache.hits} hits, {cache.misses} misses")
+    print(bot.LLM_METRICS.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end chat load test")
+    parser.add_argument("--target", choices=["handler", "generate"], default="handler",
+                        help="handle_message (default) or generate_detailed_response")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=5, help="questions per user")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a user's questions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="users start within this many seconds")
+    parser.add_argument("--symbols", default="ADAUSDT,BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT")
+    parser.add_argument("--hours", type=int, default=720, help="fixture candles per symbol")
+    parser.add_argument("--db", help="existing SQLite fixture (default: a fresh temporary one)")
+    parser.add_argument("--base-url", help="OpenAI-compatible server (default: an in-process fake)")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake server seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake server seconds per word")
+    parser.add_argument("--no-cache", action="store_true", help="disable the chat response cache")
+    parser.add_argument("--no-store", action="store_true", help="read candles from the database, not the candle store")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # main.py (the bot) reads its configuration when imported
+    os.environ["SIGNAL_SYMBOLS"] = args.symbols
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:loadtest")
+    os.environ["MARKET_DIGEST_SUMMARY"] = "0"
+
+    from openai import OpenAI
+
+    import clients
+    from candle_fixture import sqlite_engine, write_candles
+    from fake_openai import FakeOpenAI
+    from response_cache import ResponseCache
+
+    symbols = [symbol.strip() for symbol in args.symbols.split(",") if symbol.strip()]
+    db_path = args.db
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="chat-load-"), "candles.db")
+        write_candles(sqlite_engine(db_path), symbols, args.hours, replace=True)
+    clients.set_engine(sqlite_engine(db_path))
+
+    fake = None
+    base_url = args.base_url
+    if base_url is None:
+        fake = FakeOpenAI(latency=args.latency, jitter=args.jitter, token_delay=args.token_delay, seed=args.seed).start()
+        base_url = fake.base_url
+    clients.set_openai_client(OpenAI(api_key="fake", base_url=base_url, max_retries=0))
+
+    import main as bot
+
+    bot.chatbot.client = clients.get_openai_client()
+    if args.no_cache:
+        bot.chatbot.response_cache = ResponseCache(0, 0)
+    if args.no_store:
+        bot.chatbot.candle_store = None
+        bot.chatbot.resampler = None
+    else:
+        bot.candle_store.refresh()
+
+    coins = [symbol[:-4] if symbol.endswith("USDT") else symbol for symbol in symbols]
+    started = time.perf_counter()
+    conversations = asyncio.run(run_load(args, bot, coins))
+    elapsed = time.perf_counter() - started
+
+    report(args, conversations, elapsed, bot)
+    bot.llm_executor.shutdown(wait=False, cancel_futures=True)
+    bot.db_executor.shutdown(wait=False, cancel_futures=True)
+    if fake is not None:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
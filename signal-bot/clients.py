@@ -0,0 +1,85 @@
+"""
+Shared, lazily created database engine and OpenAI client.
+
+Every signal-bot module gets its connections from here, so there is one
+connection pool per process, and nothing (SQLAlchemy dialect, pymysql, openai)
+is imported or built until it is first used.
+"""
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Threads of the bot's database and OpenAI pools (main.py); both run queries, so the pool is sized from them
+DB_WORKERS = int(os.getenv("DB_WORKERS", 4))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 8))
+
+# Connection pool: DB_POOL_SIZE persistent connections, by default one per worker thread, plus
+# DB_MAX_OVERFLOW on bursts (other threads); connections are checked before use and replaced after
+# DB_POOL_RECYCLE seconds (below MySQL's wait_timeout)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", DB_WORKERS + LLM_WORKERS))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+_engine = None
+_openai_client = None
+_lock = threading.Lock()
+
+
+def database_url():
+    return (
+        f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
+
+
+def get_engine():
+    """The process-wide SQLAlchemy engine, created on first use"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+
+                if DB_POOL_SIZE + DB_MAX_OVERFLOW < DB_WORKERS + LLM_WORKERS:
+                    print(
+                        f"Warning: {DB_POOL_SIZE + DB_MAX_OVERFLOW} database connections for "
+                        f"{DB_WORKERS + LLM_WORKERS} worker threads, queries will wait for a connection"
+                    )
+                _engine = create_engine(
+                    database_url(),
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    pool_recycle=DB_POOL_RECYCLE,
+                )
+    return _engine
+
+
+def get_openai_client():
+    """The process-wide OpenAI client, created on first use"""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                # No SDK retries: each would add another full timeout, so llm.chat_completion's timeout bounds the call
+                _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _openai_client
+
+
+def set_engine(engine):
+    """Use `engine` as the shared engine (candle fixtures, load tests)"""
+    global _engine
+    with _lock:
+        _engine = engine
+
+
+def set_openai_client(client):
+    """Use `client` as the shared OpenAI client (e.g. one pointed at fake_openai.py)"""
+    global _openai_client
+    with _lock:
+        _openai_client = client
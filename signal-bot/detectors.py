@@ -0,0 +1,199 @@
+"""
+Candle pattern detectors.
+
+Each pattern is declared once as a vectorized function over candle arrays and
+registered in PATTERNS. scan_candles evaluates every registered pattern over the
+same arrays and returns both the live signals (pattern completed on the newest
+candle) and the historical signal table with exit prices and profits.
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import rsi
+from forward_returns import forward_return_matrix, max_adverse_excursion
+
+# Exit horizons (in candles) used for profits and win rates
+HORIZONS = [1, 2, 4, 6]
+
+# name -> {"detect", "buy", "sell", "signal_offset", "lookback", "params"}
+PATTERNS = {}
+
+
+def register_pattern(name, buy, sell, signal_offset=0, lookback=0, **params):
+    """Register a detector under `name`.
+
+    The detector takes a dict of candle arrays (open, high, low, close, rsi7) plus `params`
+    and returns (buy_mask, sell_mask), True on the candle that completes the pattern.
+    `buy` and `sell` are (live action, historical signal_type) labels. The trade is entered
+    at the open of the next candle; `signal_offset` shifts the candle the historical signal
+    is reported on (and exits are counted from) relative to the completing candle.
+    `lookback` is how many candles before the completing one the detector reads, as an int
+    or a function of the params.
+    """
+    def decorator(detect):
+        PATTERNS[name] = {
+            "detect": detect,
+            "buy": buy,
+            "sell": sell,
+            "signal_offset": signal_offset,
+            "lookback": lookback,
+            "params": params,
+        }
+        return detect
+    return decorator
+
+
+def pattern_lookback(patterns=None, params=None):
+    """Candles before a signal's reported candle that any pattern needs to detect it again
+
+    Incremental scans keep this many candles besides the exit horizon.
+    """
+    patterns = PATTERNS if patterns is None else patterns
+    params = params or {}
+    needed = 0
+    for name, pattern in patterns.items():
+        lookback = pattern["lookback"]
+        if callable(lookback):
+            lookback = lookback({**pattern["params"], **params.get(name, {})})
+        needed = max(needed, lookback + pattern["signal_offset"])
+    return needed
+
+
+def run_lengths(mask):
+    """Length of the run of consecutive True values ending at each position of a boolean array"""
+    counts = np.cumsum(mask)
+    last_reset = np.maximum.accumulate(np.where(mask, 0, counts))
+    return counts - last_reset
+
+
+@register_pattern("Outside Bar", buy=("BULLISH", "Outside Bar"), sell=("BEARISH", "Outside Bar"), lookback=1)
+def outside_bar(candles):
+    """Outside bar engulfing the previous candle, with the opposite colour"""
+    open_, high, low, close = candles["open"], candles["high"], candles["low"], candles["close"]
+    buy = np.zeros(len(open_), dtype=bool)
+    sell = np.zeros(len(open_), dtype=bool)
+    if len(open_) < 2:
+        return buy, sell
+
+    is_outside_bar = ((high[1:] > high[:-1]) & (low[1:] < low[:-1])).astype(bool)
+    buy[1:] = is_outside_bar & ((close[1:] > open_[1:]) & (close[:-1] < open_[:-1])).astype(bool)
+    sell[1:] = is_outside_bar & ((close[1:] < open_[1:]) & (close[:-1] > open_[:-1])).astype(bool)
+    return buy, sell
+
+
+@register_pattern(
+    "Fourth Signal",
+    buy=("Wash-out Signal", "Wash-out"),
+    sell=("Fourth Distribution Signal", "Fourth Distribution"),
+    signal_offset=1,
+    lookback=lambda params: params["run_length"] - 1,
+    run_length=3,
+    rsi_upper=70,
+    rsi_lower=30,
+)
+def fourth_signal(candles, run_length=3, rsi_upper=70, rsi_lower=30):
+    """`run_length` green candles with rsi7 above `rsi_upper` (SELL) or red below `rsi_lower` (BUY)"""
+    open_, close, rsi = candles["open"], candles["close"], candles["rsi7"]
+    sell = run_lengths(((open_ < close) & (rsi > rsi_upper)).astype(bool)) >= run_length
+    buy = run_lengths(((open_ > close) & (rsi < rsi_lower)).astype(bool)) >= run_length
+    return buy, sell
+
+
+def signal_columns(horizons=HORIZONS):
+    """Columns of the historical signal table"""
+    return (
+        ["time", "symbol", "pattern", "signal_type", "order", "entry_price"]
+        + [f"exit_price_{h}" for h in horizons]
+        + [f"profit_{h}" for h in horizons]
+        + [f"mae_{h}" for h in horizons]
+    )
+
+
+def scan_candles(df, patterns=None, params=None, horizons=HORIZONS):
+    """Run every registered pattern over one symbol's candles (sorted by open_time) in a single pass.
+
+    Returns (live_signals, history): live_signals is a list of dicts for patterns completed on
+    the last candle, history is a DataFrame with one row per signal that has all its exits,
+    with exit price, profit and max adverse excursion (mae) columns for every horizon.
+    `params` optionally overrides detector parameters per pattern name.
+    """
+    if len(df) == 0:
+        return [], pd.DataFrame(columns=signal_columns(horizons))
+
+    candles = {column: df[column].to_numpy() for column in ("open", "high", "low", "close", "rsi7") if column in df}
+    if "rsi7" not in candles:
+        # Raw OHLCV without the database's indicator columns
+        candles["rsi7"] = rsi(df["close"].to_numpy(dtype=float), 7)
+    live_hits, history = scan_arrays(
+        candles, df["open_time"].to_numpy(), df["symbol"].to_numpy(), patterns, params, horizons
+    )
+
+    patterns = PATTERNS if patterns is None else patterns
+    live_signals = [
+        {
+            "action": patterns[name][side][0],
+            "candle": df.iloc[-1],
+            "pattern": name,
+            "order": "BUY" if side == "buy" else "SELL",
+        }
+        for name, side in live_hits
+    ]
+    return live_signals, history
+
+
+def scan_arrays(candles, times, symbols, patterns=None, params=None, horizons=HORIZONS):
+    """scan_candles over raw arrays (e.g. memory-mapped); `symbols` may be an array or a single symbol.
+
+    Returns (live_hits, history) where live_hits lists (pattern name, "buy"/"sell") for
+    patterns completed on the last candle.
+    """
+    patterns = PATTERNS if patterns is None else patterns
+    params = params or {}
+    n = len(times)
+    if n == 0:
+        return [], pd.DataFrame(columns=signal_columns(horizons))
+
+    open_, high, low, close = candles["open"], candles["high"], candles["low"], candles["close"]
+    max_horizon = max(horizons)
+
+    live_hits = []
+    tables = []
+    for name, pattern in patterns.items():
+        buy, sell = pattern["detect"](candles, **{**pattern["params"], **params.get(name, {})})
+
+        if buy[-1] or sell[-1]:
+            live_hits.append((name, "buy" if buy[-1] else "sell"))
+
+        trigger = np.flatnonzero(buy | sell)
+        trigger = trigger[trigger + pattern["signal_offset"] + max_horizon < n]
+        if len(trigger) == 0:
+            continue
+
+        idx = trigger + pattern["signal_offset"]
+        is_buy = buy[trigger]
+        entry_price = open_[trigger + 1]
+
+        table = pd.DataFrame({
+            "time": times[idx],
+            "symbol": symbols[idx] if np.ndim(symbols) else symbols,
+            "pattern": name,
+            "signal_type": np.where(is_buy, pattern["buy"][1], pattern["sell"][1]),
+            "order": np.where(is_buy, "BUY", "SELL"),
+            "entry_price": entry_price,
+        })
+        exit_price, returns = forward_return_matrix(entry_price, close, idx, horizons, is_buy)
+        adverse = max_adverse_excursion(entry_price, low, high, trigger + 1, idx, horizons, is_buy)
+        table = pd.concat([
+            table,
+            pd.DataFrame(exit_price, columns=[f"exit_price_{h}" for h in horizons]),
+            pd.DataFrame(returns, columns=[f"profit_{h}" for h in horizons]),
+            pd.DataFrame(adverse, columns=[f"mae_{h}" for h in horizons]),
+        ], axis=1)
+        tables.append(table)
+
+    if not tables:
+        return live_hits, pd.DataFrame(columns=signal_columns(horizons))
+
+    history = pd.concat(tables, ignore_index=True)
+    history = history.sort_values("time", kind="stable", ignore_index=True)
+    return live_hits, history
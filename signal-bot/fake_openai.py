@@ -0,0 +1,166 @@
+"""
+OpenAI-compatible stand-in for offline benchmarks.
+
+Serves POST /v1/chat/completions, plain and streamed (server-sent events, with
+usage when stream_options.include_usage is set), from canned replies after a
+configurable delay, so ChatBot, MarketDigest and chat_load_test.py run without
+network access or cost. Point a client at it with
+OpenAI(api_key="fake", base_url="http://127.0.0.1:8808/v1") or OPENAI_BASE_URL.
+
+Usage:
+    python fake_openai.py --port 8808 --latency 0.8 --token-delay 0.02
+    python fake_openai.py --replies replies.json   # {"text in the system prompt": "reply", ...}
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# First canned reply whose key appears in the system prompt wins; "" matches everything
+CANNED_REPLIES = {
+    "technical analysis": (
+        "The coin is consolidating after a mild pullback, with price holding above the 20 period EMA. "
+        "RSI is neutral around 50, so there is no overbought or oversold pressure yet. "
+        "Support sits near the recent swing low and resistance at the last local high. "
+        "A close above resistance on the 4 hour chart would confirm a short-term uptrend. "
+        "Waiting for a retest of support offers a better entry than buying here."
+    ),
+    "market digest": "Majors are mixed over the last 24 hours with no clear direction. Momentum is strongest in the top gainers.",
+    "real-time AI-powered signals": "ADA",
+    "": "OK",
+}
+
+
+def count_tokens(text):
+    """Rough token count (4 characters per token), enough for usage numbers"""
+    return len(text) // 4 + 1
+
+
+class FakeOpenAI:
+    """Threaded fake server; start() serves in the background, base_url is what clients need"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, jitter=0.0, token_delay=0.0, replies=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.replies = {**(replies or {}), **CANNED_REPLIES}
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reply_for(self, messages):
+        system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        return next(reply for key, reply in self.replies.items() if key in system)
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(self.latency + jitter, 0.0)
+
+    def handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                    self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                messages = request.get("messages", [])
+                reply = fake.reply_for(messages)
+                usage = {
+                    "prompt_tokens": sum(count_tokens(m.get("content") or "") for m in messages),
+                    "completion_tokens": count_tokens(reply),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                head = {"id": f"chatcmpl-fake{fake.requests}", "created": int(time.time()), "model": request.get("model", "fake")}
+
+                time.sleep(fake.delay())
+                if not request.get("stream"):
+                    time.sleep(fake.token_delay * len(reply.split()))
+                    self.send_json(200, {
+                        **head,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+
+                def send(chunk):
+                    self.wfile.write(f"data: {json.dumps(chunk) if chunk != '[DONE]' else chunk}\n\n".encode())
+                    self.wfile.flush()
+
+                def choice(delta, finish_reason=None):
+                    return {**head, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+                words = reply.split(" ")
+                for i, word in enumerate(words):
+                    send(choice({"role": "assistant", "content": word if i == 0 else " " + word}))
+                    time.sleep(fake.token_delay)
+                send(choice({}, "stop"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    send({**head, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+                send("[DONE]")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies uniformly by +/- this many seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds per generated word")
+    parser.add_argument("--replies", help="JSON file of {text in the system prompt: reply}, checked before the defaults")
+    args = parser.parse_args()
+
+    replies = None
+    if args.replies:
+        with open(args.replies) as f:
+            replies = json.load(f)
+    fake = FakeOpenAI(args.host, args.port, args.latency, args.jitter, args.token_delay, replies)
+    print(f"Fake OpenAI serving {fake.base_url} (latency {args.latency}s, {args.token_delay}s per word)")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
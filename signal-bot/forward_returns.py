@@ -0,0 +1,106 @@
+"""
+Forward returns of signals over arbitrary horizons.
+
+Exit prices for every (signal, horizon) pair are gathered with a single
+fancy-indexing operation into a (signals x horizons) matrix, and all statistics
+are reductions along the signal axis, so the cost does not grow with Python
+code per horizon.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def forward_return_matrix(entry_price, close, start, horizons, is_buy):
+    """Exit prices and percentage returns of each signal (rows) after each horizon (columns)
+
+    The exit for horizon h is close[start + h]; returns are long for BUY signals and short otherwise.
+    """
+    horizons = np.asarray(horizons)
+    entry = np.asarray(entry_price)[:, None]
+    is_buy = np.asarray(is_buy, dtype=bool)[:, None]
+
+    exit_price = close[np.asarray(start)[:, None] + horizons[None, :]]
+    returns = np.where(
+        is_buy,
+        (exit_price - entry) / entry * 100,
+        (entry - exit_price) / entry * 100,
+    )
+    return exit_price, returns
+
+
+def max_adverse_excursion(entry_price, low, high, entry_index, start, horizons, is_buy):
+    """Worst percentage move against each signal between entry and each horizon's exit (<= 0)
+
+    The path for horizon h covers candles entry_index .. start + h.
+    """
+    horizons = np.asarray(horizons)
+    entry_index = np.asarray(entry_index)
+    lead = np.asarray(start) - entry_index
+    width = int(lead.max()) + int(horizons.max()) + 1
+
+    # Candle window from the entry candle onwards, clipped at the last candle (never selected)
+    window = np.minimum(entry_index[:, None] + np.arange(width)[None, :], len(low) - 1)
+    worst_low = np.minimum.accumulate(np.asarray(low, dtype=float)[window], axis=1)
+    worst_high = np.maximum.accumulate(np.asarray(high, dtype=float)[window], axis=1)
+
+    columns = lead[:, None] + horizons[None, :]
+    worst_low = np.take_along_axis(worst_low, columns, axis=1)
+    worst_high = np.take_along_axis(worst_high, columns, axis=1)
+
+    entry = np.asarray(entry_price, dtype=float)[:, None]
+    adverse = np.where(
+        np.asarray(is_buy, dtype=bool)[:, None],
+        (worst_low - entry) / entry * 100,
+        (entry - worst_high) / entry * 100,
+    )
+    return np.minimum(adverse, 0)
+
+
+def horizon_stats(returns, horizons, adverse=None, confidence=0.95):
+    """Per-horizon win rate (Wilson interval), mean/median return (normal interval) and adverse excursion"""
+    returns = np.asarray(returns, dtype=float).reshape(-1, len(horizons))
+    n = returns.shape[0]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    stats = pd.DataFrame(index=pd.Index(horizons, name="horizon"))
+    stats["signals"] = n
+
+    if n == 0:
+        for column in ["win_rate", "win_rate_low", "win_rate_high", "mean_return", "mean_return_low",
+                       "mean_return_high", "median_return", "mean_mae", "worst_mae"]:
+            stats[column] = np.nan
+        return stats
+
+    win_rate = (returns > 0).mean(axis=0)
+    denominator = 1 + z ** 2 / n
+    center = (win_rate + z ** 2 / (2 * n)) / denominator
+    half_width = z * np.sqrt(win_rate * (1 - win_rate) / n + z ** 2 / (4 * n ** 2)) / denominator
+
+    mean = returns.mean(axis=0)
+    std = returns.std(axis=0, ddof=1) if n > 1 else np.full(len(horizons), np.nan)
+    mean_half_width = z * std / np.sqrt(n)
+
+    stats["win_rate"] = win_rate
+    stats["win_rate_low"] = center - half_width
+    stats["win_rate_high"] = center + half_width
+    stats["mean_return"] = mean
+    stats["mean_return_low"] = mean - mean_half_width
+    stats["mean_return_high"] = mean + mean_half_width
+    stats["median_return"] = np.median(returns, axis=0)
+    if adverse is not None:
+        adverse = np.asarray(adverse, dtype=float).reshape(-1, len(horizons))
+        stats["mean_mae"] = adverse.mean(axis=0)
+        stats["worst_mae"] = adverse.min(axis=0)
+    else:
+        stats["mean_mae"] = np.nan
+        stats["worst_mae"] = np.nan
+    return stats
+
+
+def signal_stats(signals, horizons, confidence=0.95):
+    """horizon_stats for a signal table with profit_{h} and mae_{h} columns"""
+    returns = signals[[f"profit_{h}" for h in horizons]].to_numpy(dtype=float)
+    mae_columns = [f"mae_{h}" for h in horizons]
+    adverse = signals[mae_columns].to_numpy(dtype=float) if set(mae_columns) <= set(signals.columns) else None
+    return horizon_stats(returns, horizons, adverse, confidence)
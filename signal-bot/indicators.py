@@ -0,0 +1,214 @@
+"""
+Technical indicators computed locally from raw OHLCV.
+
+Every indicator comes in two forms that produce the same values:
+- a vectorized function over whole arrays, for history and backtests
+- a Rolling* class with an O(1) update(...) per new candle, for live data
+
+Smoothed indicators follow Wilder's convention: the first value is the simple
+average of the first `n` inputs, later values are exponentially smoothed.
+Values are NaN until enough candles have been seen.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def sma(values, n):
+    """Simple moving average over the last n values"""
+    return pd.Series(np.asarray(values, dtype=float)).rolling(n).mean().to_numpy()
+
+
+def smoothed(values, n, alpha):
+    """Exponential smoothing seeded with the simple average of the first n values"""
+    values = np.asarray(values, dtype=float)
+    seeded = np.full(len(values), np.nan)
+    if len(values) < n:
+        return seeded
+    seeded[n - 1] = values[:n].mean()
+    seeded[n:] = values[n:]
+    return pd.Series(seeded).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()
+
+
+def ema(values, n):
+    """Exponential moving average (alpha = 2 / (n + 1))"""
+    return smoothed(values, n, 2 / (n + 1))
+
+
+def rma(values, n):
+    """Wilder's moving average (alpha = 1 / n)"""
+    return smoothed(values, n, 1 / n)
+
+
+def rsi(close, n=14):
+    """Wilder's RSI"""
+    close = np.asarray(close, dtype=float)
+    result = np.full(len(close), np.nan)
+    if len(close) <= n:
+        return result
+
+    delta = np.diff(close)
+    avg_gain = rma(np.clip(delta, 0, None), n)
+    avg_loss = rma(np.clip(-delta, 0, None), n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    # A flat market (no gains and no losses) is neutral
+    result[1:] = np.where((avg_gain == 0) & (avg_loss == 0), 50.0, values)
+    result[1:][np.isnan(avg_gain)] = np.nan
+    return result
+
+
+def true_range(high, low, close):
+    """True range; the first candle uses high - low"""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = np.r_[np.nan, close[:-1]]
+    ranges = np.vstack([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    return np.nanmax(ranges, axis=0)
+
+
+def atr(high, low, close, n=14):
+    """Wilder's average true range"""
+    return rma(true_range(high, low, close), n)
+
+
+def bollinger_bands(close, n=20, width=2):
+    """(middle, upper, lower) bands: SMA(n) +/- width * population standard deviation"""
+    series = pd.Series(np.asarray(close, dtype=float))
+    middle = series.rolling(n).mean().to_numpy()
+    deviation = series.rolling(n).std(ddof=0).to_numpy()
+    return middle, middle + width * deviation, middle - width * deviation
+
+
+def add_indicators(df, rsi_period=14, ema_period=20, sma_period=50, atr_period=14, bb_period=20, bb_width=2):
+    """Copy of a candle DataFrame (sorted by open_time) with locally computed indicator columns"""
+    df = df.copy()
+    close = df["close"].to_numpy(dtype=float)
+    df[f"rsi{rsi_period}"] = rsi(close, rsi_period)
+    df[f"ema{ema_period}"] = ema(close, ema_period)
+    df[f"sma{sma_period}"] = sma(close, sma_period)
+    df[f"atr{atr_period}"] = atr(df["high"], df["low"], close, atr_period)
+    df["bb_middle"], df["bb_upper"], df["bb_lower"] = bollinger_bands(close, bb_period, bb_width)
+    return df
+
+
+class RollingSMA:
+    def __init__(self, n):
+        self.n = n
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, x):
+        if len(self.window) == self.n:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        if len(self.window) == self.n:
+            self.value = self.total / self.n
+        return self.value
+
+
+class RollingSmoothed:
+    """Incremental counterpart of smoothed()"""
+
+    def __init__(self, n, alpha):
+        self.n = n
+        self.alpha = alpha
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = math.nan
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.n:
+            self.seed_total += x
+        elif self.count == self.n:
+            self.value = (self.seed_total + x) / self.n
+        else:
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class RollingEMA(RollingSmoothed):
+    def __init__(self, n):
+        super().__init__(n, 2 / (n + 1))
+
+
+class RollingRMA(RollingSmoothed):
+    def __init__(self, n):
+        super().__init__(n, 1 / n)
+
+
+class RollingRSI:
+    def __init__(self, n=14):
+        self.prev_close = None
+        self.avg_gain = RollingRMA(n)
+        self.avg_loss = RollingRMA(n)
+        self.value = math.nan
+
+    def update(self, close):
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            gain = self.avg_gain.update(max(delta, 0.0))
+            loss = self.avg_loss.update(max(-delta, 0.0))
+            if not math.isnan(gain):
+                if loss == 0:
+                    self.value = 50.0 if gain == 0 else 100.0
+                else:
+                    self.value = 100 - 100 / (1 + gain / loss)
+        self.prev_close = close
+        return self.value
+
+
+class RollingATR:
+    def __init__(self, n=14):
+        self.prev_close = None
+        self.average = RollingRMA(n)
+        self.value = math.nan
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = self.average.update(tr)
+        return self.value
+
+
+class RollingBollinger:
+    def __init__(self, n=20, width=2):
+        self.n = n
+        self.width = width
+        self.window = deque(maxlen=n)
+        self.value = (math.nan, math.nan, math.nan)
+
+    def update(self, close):
+        # Mean and deviation over the fixed-size window (n is small, so this stays O(1) per candle)
+        self.window.append(close)
+        if len(self.window) == self.n:
+            middle = sum(self.window) / self.n
+            deviation = math.sqrt(sum((x - middle) ** 2 for x in self.window) / self.n)
+            self.value = (middle, middle + self.width * deviation, middle - self.width * deviation)
+        return self.value
+
+
+class IndicatorSet:
+    """Live indicators of one symbol, updated once per closed candle (same columns as add_indicators)"""
+
+    def __init__(self, rsi_period=14, ema_period=20, sma_period=50, atr_period=14, bb_period=20, bb_width=2):
+        self.names = (f"rsi{rsi_period}", f"ema{ema_period}", f"sma{sma_period}", f"atr{atr_period}")
+        self.rsi = RollingRSI(rsi_period)
+        self.ema = RollingEMA(ema_period)
+        self.sma = RollingSMA(sma_period)
+        self.atr = RollingATR(atr_period)
+        self.bollinger = RollingBollinger(bb_period, bb_width)
+        self.values = {}
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        values = (self.rsi.update(close), self.ema.update(close), self.sma.update(close), self.atr.update(high, low, close))
+        self.values = dict(zip(self.names, values))
+        self.values["bb_middle"], self.values["bb_upper"], self.values["bb_lower"] = self.bollinger.update(close)
+        return self.values
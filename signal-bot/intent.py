@@ -0,0 +1,143 @@
+"""
+Local intent classifier for chat messages.
+
+Resolves the coins a message asks about without a network call, using a
+ticker/name dictionary, fuzzy matching of misspelled coin names and a few
+whole-market phrases. classify() returns the same format as the LLM
+classifier ("BTC, ALGO" or "all"), or None when the message is ambiguous and
+should go to the LLM. Coin names and tickers that are also ordinary words only
+count when written as a name ("Stellar", "$XLM", "OP"); a message where they
+could be either goes to the LLM.
+"""
+import re
+from difflib import get_close_matches
+
+# Ticker -> names users write instead of the ticker
+COIN_NAMES = {
+    "BTC": ["bitcoin"],
+    "ETH": ["ethereum", "ether"],
+    "ADA": ["cardano"],
+    "XRP": ["ripple"],
+    "ALGO": ["algorand"],
+    "SOL": ["solana"],
+    "BNB": ["binance coin"],
+    "DOGE": ["dogecoin"],
+    "DOT": ["polkadot"],
+    "AVAX": ["avalanche"],
+    "LINK": ["chainlink"],
+    "MATIC": ["polygon"],
+    "LTC": ["litecoin"],
+    "TRX": ["tron"],
+    "ATOM": ["cosmos"],
+    "XLM": ["stellar"],
+    "SHIB": ["shiba inu", "shiba"],
+    "UNI": ["uniswap"],
+    "NEAR": ["near protocol"],
+    "APT": ["aptos"],
+    "SUI": ["sui network"],
+    "TON": ["toncoin"],
+    "HBAR": ["hedera"],
+    "FIL": ["filecoin"],
+    "ICP": ["internet computer"],
+    "ARB": ["arbitrum"],
+    "OP": ["optimism"],
+    "PEPE": ["pepe coin"],
+}
+
+# Tickers that are also ordinary words; they only count when written in capitals
+WORD_TICKERS = {"ONE", "NEAR", "OP", "GAS", "SAND", "LINK", "DOT", "UNI", "TON", "ID", "AR", "SUI", "APT", "FIL", "ATOM"}
+
+# Coin names that are also ordinary words; they only count capitalized mid-sentence or with a $ prefix
+WORD_NAMES = {"ether", "ripple", "avalanche", "polygon", "cosmos", "stellar", "optimism", "internet computer"}
+
+# English words never fuzzy matched to a coin name (the fuzzy cutoff lets them through otherwise)
+COMMON_WORDS = {
+    "either", "ethers", "other", "others", "ripples", "rippled", "avalanches", "polygons", "cosmic",
+    "stellars", "optimist", "optimistic", "optimize", "solar", "solaris",
+}
+
+# Phrases that ask about the whole crypto market ("crypto market", "all coins", "How is the market today?");
+# "market" alone or another market ("stock market") goes to the LLM
+MARKET_PATTERN = re.compile(
+    r"\b(crypto ?(currency )?markets?|coin markets?|all (coins|tokens|cryptos?)|every (coin|token)|crypto today"
+    r"|how('s| is| does) the (overall )?market|(?<!stock )(the )?market today|the (overall )?market (right )?now)\b",
+    re.IGNORECASE,
+)
+
+# Names shorter than this are never fuzzy matched (too many false positives)
+FUZZY_MIN_LENGTH = 5
+FUZZY_CUTOFF = 0.85
+
+
+class IntentClassifier:
+    def __init__(self, tickers=(), names=COIN_NAMES):
+        self.tickers = set(names) | {ticker.upper() for ticker in tickers}
+        self.names = {}
+        for ticker, aliases in names.items():
+            for alias in aliases:
+                self.names[alias] = ticker
+        # Only distinctive names are fuzzy matched; a misspelled ordinary word is just a word
+        self.fuzzy_names = [
+            name for name in self.names if " " not in name and len(name) >= FUZZY_MIN_LENGTH and name not in WORD_NAMES
+        ]
+
+    def classify(self, query):
+        """'BTC, ALGO' for the coins mentioned, 'all' for the whole market, None when unsure
+
+        >>> IntentClassifier().classify("How is the market today?")
+        'all'
+        >>> IntentClassifier().classify("stellar performance today?") is None
+        True
+        >>> IntentClassifier().classify("How is the stock market today?") is None
+        True
+        """
+        found = []
+        ambiguous = False
+
+        # Multi-word names first, so 'binance coin' is not read as something else
+        for name, ticker in self.names.items():
+            if " " not in name:
+                continue
+            for match in re.finditer(rf"(\$?)\b({re.escape(name)})\b", query, re.IGNORECASE):
+                if name not in WORD_NAMES or is_name(query, match.start(2), match.group(2), match.group(1)):
+                    found.append((match.start(), ticker))
+                elif match.group(2)[0].isupper():
+                    ambiguous = True
+
+        for match in re.finditer(r"(\$?)([A-Za-z0-9]+)", query):
+            prefix, word = match.groups()
+            upper = word.upper()
+            lower = word.lower()
+            if upper.endswith("USDT") and upper[:-4] in self.tickers:
+                upper = upper[:-4]
+            if upper in self.tickers and (word.isupper() or prefix or upper not in WORD_TICKERS):
+                found.append((match.start(), upper))
+            elif lower in self.names and " " not in lower:
+                if lower not in WORD_NAMES or is_name(query, match.start(2), word, prefix):
+                    found.append((match.start(), self.names[lower]))
+                elif word[0].isupper():
+                    # "Stellar" opening a sentence may be the coin or the adjective
+                    ambiguous = True
+            elif len(word) >= FUZZY_MIN_LENGTH and lower not in COMMON_WORDS and lower not in WORD_NAMES:
+                close = get_close_matches(lower, self.fuzzy_names, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    found.append((match.start(), self.names[close[0]]))
+
+        if ambiguous:
+            return None
+        tickers = list(dict.fromkeys(ticker for _, ticker in sorted(found)))
+        if tickers:
+            return ", ".join(tickers)
+        if MARKET_PATTERN.search(query):
+            return "all"
+        return None
+
+
+def is_name(query, start, word, prefix):
+    """A word written as a proper name: $-prefixed, or capitalized somewhere other than the start of a sentence"""
+    if prefix:
+        return True
+    if not word[0].isupper():
+        return False
+    before = query[:start].rstrip()
+    return bool(before) and before[-1] not in ".!?"
@@ -1,122 +1,239 @@
 import os
-import pandas as pd
+import sys
 import asyncio
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from telegram.ext import Application
 from dotenv import load_dotenv
 from tradebot import TradeBot  
+from candle_store import CandleStore
+from resample import Resampler
+from signal_history import SignalHistory
+from market_digest import MarketDigest
+from admission import AdmissionController, Rejected
+# dexonic/ (code shared by the bots) lives in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dexonic.llm import LLM_METRICS, BudgetExceeded
+from telegram_limits import TELEGRAM_LIMITER, with_retry
 from datetime import datetime
-from sqlalchemy import create_engine
-from openai import OpenAI
-from ChatBot import ChatBot
+from sqlalchemy import text, bindparam
+from clients import DB_WORKERS, LLM_WORKERS, get_engine
+from ChatBot import ChatBot, support_coins
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackContext
 from telegram import Update
+from telegram.error import BadRequest
 
 load_dotenv()
 
-#Get OpenAPI Key
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-chatbot = ChatBot(OPENAI_API_KEY, openai_client)
+# The OpenAI client (OPENAI_API_KEY) is created on first use by clients.get_openai_client
+chatbot = ChatBot()
 
 # Get Telegram token
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID")
+# Chats allowed to use operator commands (/llm_stats), comma separated; none when unset
+ADMIN_CHAT_IDS = [int(chat_id) for chat_id in os.getenv("ADMIN_CHAT_IDS", "").split(",") if chat_id.strip()]
 trade_bot = TradeBot(TOKEN, CHANNEL_ID)
 
-# Get Database information
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
-
-SYMBOL = "ADAUSDT"
-
-# SQL query for historical data 
-HISTORICAL_QUERY = f"""
-SELECT * FROM f_coin_signal_1h 
-WHERE symbol = '{SYMBOL}' 
-AND open_time > (UNIX_TIMESTAMP(now()) - 2592000)  -- Last 30 days 
-ORDER BY open_time ASC;
-"""
-
-# SQL query for recent data 
-RECENT_QUERY = f"""
-SELECT * FROM f_coin_signal_1h 
-WHERE symbol = '{SYMBOL}' 
-AND open_time > (UNIX_TIMESTAMP(now()) - 86400)  -- Last 24 hours
-ORDER BY open_time DESC 
-LIMIT 10;
-"""
+# Database access goes through the shared pooled engine (clients.get_engine), created on first query
+
+# Symbols scanned every hour (SIGNAL_SYMBOLS in .env, comma separated)
+SYMBOLS = support_coins
+
+# Recent candles of every symbol, shared by the signal job and the chat handler
+candle_store = CandleStore(None, SYMBOLS)
+chatbot.candle_store = candle_store
+chatbot.resampler = Resampler(candle_store)
+
+# Whole-market digest rebuilt once per closed candle; answers /market and "how is the market" questions
+market_digest = MarketDigest(candle_store, SYMBOLS, summarize=os.getenv("MARKET_DIGEST_SUMMARY", "1") == "1")
+chatbot.market_digest = market_digest
+
+# Every signal sent, deduplicated per candle; backs /signals and /stats
+signal_history = SignalHistory()
+
+# Candle close watermark: cheap per-symbol MAX(open_time) over rows newer than what we have processed
+WATERMARK_QUERY = text("""
+SELECT symbol, MAX(open_time) AS open_time FROM f_coin_signal_1h 
+WHERE symbol IN :symbols 
+AND open_time > :since 
+GROUP BY symbol;
+""").bindparams(bindparam("symbols", expanding=True))
+
+CANDLE_SECONDS = 3600
+# How often to poll for the closed candle after a boundary, and how long to keep waiting for late symbols
+CANDLE_POLL_INTERVAL = int(os.getenv("CANDLE_POLL_INTERVAL", 5))
+CANDLE_WAIT_TIMEOUT = int(os.getenv("CANDLE_WAIT_TIMEOUT", 900))
+# Past CANDLE_WAIT_TIMEOUT a late candle is still waited for, polling this often (seconds)
+CANDLE_LATE_POLL_INTERVAL = int(os.getenv("CANDLE_LATE_POLL_INTERVAL", 60))
+last_late_poll = 0.0
+
+signal_lock = asyncio.Lock()
+
+# Blocking database and OpenAI work runs on bounded thread pools so the event loop keeps serving updates
+# (sizes in clients.py, which gives the connection pool a connection per thread)
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+# Chat admission: concurrent analyses (at most one per LLM thread), waiting ones, and pending questions per user
+CHAT_MAX_CONCURRENT = min(int(os.getenv("CHAT_MAX_CONCURRENT", LLM_WORKERS)), LLM_WORKERS)
+CHAT_MAX_QUEUED = int(os.getenv("CHAT_MAX_QUEUED", 50))
+CHAT_PER_USER = int(os.getenv("CHAT_PER_USER", 2))
+admission = AdmissionController(CHAT_MAX_CONCURRENT, CHAT_MAX_QUEUED, CHAT_PER_USER)
+
+async def run_blocking(executor, func, *args):
+    """Run a blocking call on one of the thread pools without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
 
 def calculate_historical_win_rates():
+    """Load new candles for every symbol into the candle store and update the rolling win rates.
 
+    Returns {symbol: live signals} for the symbols that received new candles.
+    """
     try:
-        print("Calculating historical win rates...")
-        df = pd.read_sql(HISTORICAL_QUERY, engine)
+        print("Updating historical win rates...")
+        df = candle_store.refresh()
         
         if df.empty:
-            print("No historical data found!")
-            return
+            print("No new historical data found!")
+            return {}
             
-        print(f"Loaded {len(df)} historical candles for {SYMBOL}")
-        
-        results = trade_bot.analyze_historical_performance(df)
-        
-        trade_bot.outside_bar_results = results['Outside Bar']
-        trade_bot.fourth_signal_results = results['Fourth Signal']
+        print(f"Loaded {len(df)} new historical candles for {df['symbol'].nunique()} symbols")
         
-        outside_win_rates = results['Outside Bar']['win_rates']
-        outside_total = results['Outside Bar']['total_signals']
-        print(f"Outside Bar Win Rates ({outside_total} signals):")
-        print(f"- 1 Candle: {outside_win_rates.get(1, 0):.2%}")
-        print(f"- 2 Candles: {outside_win_rates.get(2, 0):.2%}")
-        print(f"- 4 Candles: {outside_win_rates.get(4, 0):.2%}")
-        print(f"- 6 Candles: {outside_win_rates.get(6, 0):.2%}")
+        updated = trade_bot.update_historical_performance(df)
         
-        fourth_win_rates = results['Fourth Signal']['win_rates']
-        fourth_total = results['Fourth Signal']['total_signals']
-        print(f"Fourth Signal Win Rates ({fourth_total} signals):")
-        print(f"- 1 Candle: {fourth_win_rates.get(1, 0):.2%}")
-        print(f"- 2 Candles: {fourth_win_rates.get(2, 0):.2%}")
-        print(f"- 4 Candles: {fourth_win_rates.get(4, 0):.2%}")
-        print(f"- 6 Candles: {fourth_win_rates.get(6, 0):.2%}")
+        for symbol in updated:
+            for name, results in trade_bot.results[symbol].items():
+                print(
+                    f"{symbol} {name} ({results['total_signals']} signals): "
+                    + ", ".join(f"{n} Candle: {rate:.2%}" for n, rate in results['win_rates'].items())
+                )
+        return updated
         
     except Exception as e:
         print(f"Error calculating historical win rates: {e}")
+        return {}
 
 async def check_signals(context):
 
+    async with signal_lock:
+        await run_signal_checks()
+
+async def run_signal_checks():
+
     try:
-        calculate_historical_win_rates()
+        updated = await run_blocking(db_executor, calculate_historical_win_rates)
         
-        df = pd.read_sql(RECENT_QUERY, engine)
         now = datetime.now()
         formatted_time = now.strftime("%d/%m/%Y %I:%M %p")
         print(f"Checking data at: {formatted_time}")
         
-        if len(df) < 3:  
-            print("Not enough data!")
-            return
-            
-        outside_signal, candle = trade_bot.detect_outside_bar(df)
-        if outside_signal:
-            print(f"{outside_signal} Outside Bar Signal DETECTED at {candle['open_time']}!")
-            await trade_bot.send_trade_signal(outside_signal, candle, "Outside Bar")
-        
-        fourth_signal, fourth_candle, order_type = trade_bot.detect_fourth_signal(df)
-        if fourth_signal:
-            print(f"{fourth_signal} DETECTED at {fourth_candle['open_time']}!")
-            await trade_bot.send_trade_signal(fourth_signal, fourth_candle, "Fourth Signal")
-            
-        if not outside_signal and not fourth_signal:
+        signals = [signal for live_signals in updated.values() for signal in live_signals]
+        if not signals:
             print("No signals detected.")
+            if updated:
+                run_in_background(update_market_digest([]))
+            return
+
+        for signal in signals:
+            print(f"{signal['action']} {signal['pattern']} DETECTED for {signal['candle']['symbol']} at {signal['candle']['open_time']}!")
+
+        # Recording first claims the candle, so an overlapping check cannot send the same signal twice
+        try:
+            signals = await run_blocking(db_executor, signal_history.record, signals)
+        except Exception as e:
+            print(f"Error recording signal history: {e}")
+        # Built in the background with the signals about to be sent, so the optional LLM summary does not delay them
+        run_in_background(update_market_digest(signals))
+        if not signals:
+            print("Signals were already sent for this candle.")
+            return
+
+        # One at a time, waiting out Telegram's flood control; a signal that still fails is forgotten,
+        # so a later check of the same candle (e.g. the one at startup) sends it again
+        for signal in signals:
+            try:
+                await with_retry(lambda: trade_bot.send_trade_signal(
+                    signal['action'], signal['candle'], signal['pattern'], signal['order']
+                ))
+            except Exception as e:
+                print(f"Error sending signal: {e}")
+                try:
+                    await run_blocking(db_executor, signal_history.forget, signal)
+                except Exception as e:
+                    print(f"Error forgetting unsent signal: {e}")
             
     except Exception as e:
         print(f"Error checking signals: {e}")
 
+# The event loop keeps only weak references to tasks; these keep background tasks alive until they finish
+background_tasks = set()
+
+def run_in_background(coroutine):
+    task = asyncio.ensure_future(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_task_done)
+    return task
+
+def background_task_done(task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error in background task: {task.exception()}")
+
+# Digest updates run one at a time, so two refreshes of a candle cannot both summarize it or drop signals
+market_digest_lock = asyncio.Lock()
+
+async def update_market_digest(sent_signals):
+    async with market_digest_lock:
+        try:
+            await run_blocking(llm_executor, market_digest.update, sent_signals)
+        except Exception as e:
+            print(f"Error updating market digest: {e}")
+
+def fetch_watermarks(since):
+    """(symbol, newest open_time) for symbols with rows newer than `since`"""
+    with get_engine().connect() as connection:
+        return connection.execute(WATERMARK_QUERY, {"symbols": SYMBOLS, "since": int(since)}).fetchall()
+
+async def watch_new_candles(context):
+    """Run signal checks as soon as the candle that just closed shows up in f_coin_signal_1h.
+
+    From the candle boundary until every symbol's row arrives this polls a cheap watermark query,
+    every tick for CANDLE_WAIT_TIMEOUT and then every CANDLE_LATE_POLL_INTERVAL, so a late candle is
+    still processed while it is the newest one (live signals only look at the newest candle).
+    Once the candle is in, it does not touch the database until the next boundary.
+    """
+    global last_late_poll
+    if signal_lock.locked():
+        return
+
+    now = time.time()
+    current_open = now - now % CANDLE_SECONDS
+    closed_open = current_open - CANDLE_SECONDS
+
+    # Symbols without state (no rows at all) are ignored, or they would keep the poll busy every hour
+    processed = {symbol: trade_bot.rolling_state.get(symbol, {}).get('last_open_time') for symbol in SYMBOLS}
+    processed = {symbol: open_time for symbol, open_time in processed.items() if open_time is not None}
+    if processed and all(open_time >= closed_open for open_time in processed.values()):
+        return
+
+    if now - current_open > CANDLE_WAIT_TIMEOUT:
+        if now - last_late_poll < CANDLE_LATE_POLL_INTERVAL:
+            return
+        last_late_poll = now
+
+    try:
+        since = trade_bot.oldest_open_time(SYMBOLS) or 0
+        watermarks = await run_blocking(db_executor, fetch_watermarks, since)
+    except Exception as e:
+        print(f"Error polling candle watermark: {e}")
+        return
+
+    if any(processed.get(symbol) is None or open_time > processed[symbol] for symbol, open_time in watermarks):
+        print(f"New candle detected {now - current_open:.0f}s after the boundary")
+        await check_signals(context)
+
 async def start(update: Update, context: CallbackContext):
     """Send a message when the command /start is issued."""
     welcome_message = """
@@ -131,39 +248,221 @@ Try asking me about a specific coin like:
 "How is ADA looking today?"
 "What's your analysis on ADA?"
 
+Commands:
+/signals ADA 7d - signals sent for a coin
+/stats - win rates of every pattern
+/market - market digest of the last hour
+
     """
     await update.message.reply_text(welcome_message)
 
+# Streamed answers: minimum seconds between edits of the same message (Telegram throttles frequent edits)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.5))
+STREAM_POLL_INTERVAL = 0.2
+TELEGRAM_MESSAGE_LIMIT = 4096
+EMPTY_ANSWER = "Sorry, I couldn't come up with an answer. Please try rephrasing your question."
+
+async def edit_reply(message, text):
+    """Edit a sent message, ignoring Telegram's 'message is not modified' error"""
+    try:
+        await message.edit_text(text[:TELEGRAM_MESSAGE_LIMIT])
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
+def split_message(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """Split text into Telegram-sized parts, preferring line then word boundaries"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+async def send_answer(update, reply, text):
+    """Replace the placeholder with the answer (continued in new messages when long); a new reply if editing fails.
+
+    Every message waits for the shared rate limiter and is sent again after a RetryAfter.
+    """
+    parts = split_message(text) or [EMPTY_ANSWER]
+    try:
+        await with_retry(lambda: edit_reply(reply, parts[0]))
+    except Exception as e:
+        print(f"Error editing reply, sending a new message: {e}")
+        await with_retry(lambda: update.message.reply_text(parts[0]))
+    for part in parts[1:]:
+        await with_retry(lambda: update.message.reply_text(part))
+
 async def handle_message(update: Update, context: CallbackContext):
   
     user_message = update.message.text
     user_id = update.effective_user.id
     
     print(f"Received message from {user_id}: {user_message}")
-    
-    with engine.connect() as connection:
-        response = chatbot.generate_detailed_response(user_message, connection)
-        
-        await update.message.reply_text(response)
+
+    async def compute(job):
+        return await run_blocking(llm_executor, partial(chatbot.generate_detailed_response, user_message, on_delta=job.on_delta))
+
+    # Identical pending questions share one answer; over-eager users and a full queue are turned away
+    try:
+        job = admission.submit(user_id, user_message, compute)
+    except Rejected as e:
+        await with_retry(lambda: update.message.reply_text(str(e)))
+        return
+
+    # Reply at once, then edit the placeholder as the analysis streams in
+    placeholder = "Your question is queued, the answer will follow shortly..." if job.queued else "Analyzing..."
+    reply = await with_retry(lambda: update.message.reply_text(placeholder))
+    task = job.task
+    shown = ""
+    last_edit = 0.0
+    while not task.done():
+        await asyncio.wait({task}, timeout=STREAM_POLL_INTERVAL)
+        text = job.text
+        if task.done() or not text or text == shown or time.monotonic() - last_edit < STREAM_EDIT_INTERVAL:
+            continue
+        # Progress edits are optional: skipped while the shared rate limit is used up
+        if not TELEGRAM_LIMITER.try_acquire():
+            continue
+        try:
+            await edit_reply(reply, text + " ...")
+            shown = text
+        except Exception as e:
+            print(f"Error editing streamed reply: {e}")
+        last_edit = time.monotonic()
+
+    try:
+        response = task.result()
+    except BudgetExceeded as e:
+        print(f"Error generating response: {e}")
+        response = "I've reached my analysis limit for today, please try again tomorrow."
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        response = "Sorry, I couldn't process your request right now. Please try again later."
+
+    try:
+        await send_answer(update, reply, (response or "").strip())
+    except Exception as e:
+        print(f"Error sending response: {e}")
+
+PERIOD_UNITS = {"h": 3600, "d": 86400, "w": 604800}
+
+def parse_symbol(arg):
+    symbol = arg.strip().upper()
+    return symbol if symbol.endswith("USDT") else symbol + "USDT"
+
+def parse_period(arg):
+    """'12h', '7d', '2w' -> seconds"""
+    value, unit = arg[:-1], arg[-1].lower()
+    if not value.isdigit() or unit not in PERIOD_UNITS:
+        raise ValueError(f"Invalid period '{arg}', use e.g. 12h, 7d or 2w")
+    return int(value) * PERIOD_UNITS[unit]
+
+async def signals_command(update: Update, context: CallbackContext):
+    """/signals SYMBOL [period]: signals sent for a symbol, e.g. /signals ADA 7d"""
+    if not context.args:
+        await update.message.reply_text("Usage: /signals ADA 7d")
+        return
+
+    symbol = parse_symbol(context.args[0])
+    if symbol not in SYMBOLS:
+        await update.message.reply_text(f"Sorry, I don't track {symbol}.")
+        return
+    period_arg = context.args[1] if len(context.args) > 1 else "7d"
+    try:
+        period = parse_period(period_arg)
+        rows = await run_blocking(db_executor, signal_history.recent, symbol, period)
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+    except Exception as e:
+        print(f"Error reading signal history: {e}")
+        await update.message.reply_text("I couldn't retrieve the signal history at this time.")
+        return
+
+    if not rows:
+        await update.message.reply_text(f"No signals for {symbol} in the last {period_arg}.")
+        return
+
+    message = f"Signals for {symbol}:\n"
+    for _, signal_type, action, order_type, open_time, open_, close in rows:
+        message += f"{datetime.fromtimestamp(open_time):%d/%m %H:%M} {action} ({signal_type}) {order_type} @ ${close}\n"
+    await update.message.reply_text(message)
+
+async def stats_command(update: Update, context: CallbackContext):
+    """/stats [SYMBOL]: rolling 30 day win rates and signals sent, from precomputed aggregates"""
+    symbols = [parse_symbol(arg) for arg in context.args] if context.args else SYMBOLS
+    try:
+        await run_blocking(db_executor, signal_history.refresh_if_stale)
+    except Exception as e:
+        print(f"Error refreshing signal history summary: {e}")
+
+    message = ""
+    for symbol in symbols:
+        results = trade_bot.results.get(symbol)
+        if not results:
+            continue
+        message += f"{symbol}\n"
+        for name, result in results.items():
+            win_rates = ", ".join(f"{h}: {rate:.0%}" for h, rate in result.get('win_rates', {}).items())
+            message += f"- {name}: {result.get('total_signals', 0)} signals, win rates {win_rates}\n"
+        for signal_type, order_type, count, last_open_time in signal_history.symbol_summary(symbol):
+            message += f"- Sent {count} {signal_type} {order_type} in 30 days, last {datetime.fromtimestamp(last_open_time):%d/%m %H:%M}\n"
+
+    if not message:
+        message = "No statistics available yet."
+    # Telegram messages are limited to 4096 characters
+    await update.message.reply_text(message[:4000])
+
+async def load_signal_history(context):
+    """Load the persisted signal aggregates at startup so /stats has them before the first signal"""
+    try:
+        await run_blocking(db_executor, signal_history.refresh_if_stale)
+    except Exception as e:
+        print(f"Error loading signal history: {e}")
+
+async def market_command(update: Update, context: CallbackContext):
+    """/market: the digest of the last closed candle"""
+    digest = market_digest.latest()
+    await update.message.reply_text(digest or "The market digest is not ready yet, please try again in a moment.")
+
+async def llm_stats_command(update: Update, context: CallbackContext):
+    """/llm_stats: LLM calls, latency, tokens and budget per call site (ADMIN_CHAT_IDS only)"""
+    await update.message.reply_text(LLM_METRICS.render()[:4000])
 
 def main():
     
     
-    # Create the application
-    application = Application.builder().token(TOKEN).build()
+    # Create the application; updates are processed concurrently so one slow answer does not hold up other users
+    application = Application.builder().token(TOKEN).concurrent_updates(CHAT_MAX_CONCURRENT + CHAT_MAX_QUEUED + 8).build()
     
     job_queue = application.job_queue
-    job_queue.run_repeating(check_signals, interval=3600, first=5)  
+    job_queue.run_once(load_signal_history, when=1)
+    job_queue.run_once(check_signals, when=5)
+    job_queue.run_repeating(watch_new_candles, interval=CANDLE_POLL_INTERVAL, first=5 + CANDLE_POLL_INTERVAL)
 
     application.add_handler(CommandHandler("start", start))
     # application.add_handler(CommandHandler("list_coin", list_coin))
+    application.add_handler(CommandHandler("signals", signals_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("market", market_command))
+    application.add_handler(CommandHandler("llm_stats", llm_stats_command, filters=filters.Chat(chat_id=ADMIN_CHAT_IDS)))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     
-    print(f"Bot started! Monitoring {SYMBOL} for trade signals, calculating win rates for 1, 2, 4, and 6 candles...")
-    print(f"Bot will recalculate every hour.")
+    print(f"Bot started! Monitoring {len(SYMBOLS)} symbols for trade signals, calculating win rates for 1, 2, 4, and 6 candles...")
+    print(f"Bot will check signals as soon as each 1h candle closes (polling every {CANDLE_POLL_INTERVAL}s after the boundary).")
     
     # Run the bot
     application.run_polling()
 
+    db_executor.shutdown(wait=False, cancel_futures=True)
+    llm_executor.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == "__main__":
     main()
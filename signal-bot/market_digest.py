@@ -0,0 +1,153 @@
+"""
+Market digest across every supported symbol, rebuilt once per closed candle.
+
+MarketDigest.update() collects the biggest movers and RSI extremes from the
+in-memory candle store (no queries) together with every signal sent for the
+candle so far, optionally adds a one-shot LLM summary, and keeps the rendered
+text so "how is the market" questions and /market are answered instantly.
+Updates are not thread-safe with each other; callers run them one at a time.
+"""
+import os
+import sys
+import threading
+from datetime import datetime
+
+from clients import get_openai_client
+# dexonic/ (code shared by the bots) lives in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dexonic.llm import LLM_METRICS, chat_completion
+from prompt_data import PROMPT_TIMEZONE
+
+TOP_MOVERS = 5
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+
+def percent_change(candles, candles_back):
+    close = candles["close"].to_numpy(dtype=float)
+    if len(close) <= candles_back:
+        return None
+    return (close[-1] / close[-1 - candles_back] - 1) * 100
+
+
+class MarketDigest:
+    def __init__(self, store, symbols, client=None, summarize=True):
+        self.store = store
+        self.symbols = list(symbols)
+        # None: the shared OpenAI client, created on first summary
+        self.client = client
+        self.summarize = summarize
+        self.text = None
+        self.open_time = None
+        self.summary = None
+        self.signals = {}  # candle open_time -> ["ADAUSDT Outside Bar BUY", ...] sent for that candle
+        self.lock = threading.Lock()
+
+    def add_signals(self, signals):
+        """Remember signals sent (dicts from scan_candles) under their candle's open_time"""
+        for signal in signals or []:
+            text = f"{signal['candle']['symbol']} {signal['pattern']} {signal['order']}"
+            sent = self.signals.setdefault(int(signal['candle']['open_time']), [])
+            if text not in sent:
+                sent.append(text)
+
+    def build(self):
+        """Digest dict for the newest candle in the store"""
+        rows = []
+        for symbol in self.symbols:
+            candles = self.store.tail(symbol, 25)
+            if candles is None or candles.empty:
+                continue
+            rows.append({
+                "symbol": symbol,
+                "open_time": int(candles["open_time"].iloc[-1]),
+                "close": float(candles["close"].iloc[-1]),
+                "change_1h": percent_change(candles, 1),
+                "change_24h": percent_change(candles, 24),
+                "rsi14": self.store.indicators(symbol).get("rsi14"),
+            })
+
+        ranked = sorted((row for row in rows if row["change_24h"] is not None), key=lambda row: row["change_24h"])
+        with_rsi = [row for row in rows if row["rsi14"] is not None and row["rsi14"] == row["rsi14"]]
+        open_time = max((row["open_time"] for row in rows), default=None)
+        return {
+            "open_time": open_time,
+            "symbols": len(rows),
+            "gainers": [row for row in reversed(ranked[-TOP_MOVERS:]) if row["change_24h"] > 0],
+            "losers": [row for row in ranked[:TOP_MOVERS] if row["change_24h"] < 0],
+            "overbought": sorted((row for row in with_rsi if row["rsi14"] >= RSI_OVERBOUGHT), key=lambda row: -row["rsi14"]),
+            "oversold": sorted((row for row in with_rsi if row["rsi14"] <= RSI_OVERSOLD), key=lambda row: row["rsi14"]),
+            "signals": list(self.signals.get(open_time, [])),
+        }
+
+    def render(self, digest):
+        def movers(rows):
+            return ", ".join(f"{row['symbol']} {row['change_24h']:+.2f}%" for row in rows) or "none"
+
+        def rsi(rows):
+            return ", ".join(f"{row['symbol']} {row['rsi14']:.0f}" for row in rows) or "none"
+
+        candle_time = datetime.fromtimestamp(digest["open_time"], tz=PROMPT_TIMEZONE) if digest["open_time"] else None
+        lines = [
+            f"Market digest ({digest['symbols']} coins, 1h candle {candle_time:%d/%m %H:%M} GMT+7)" if candle_time
+            else f"Market digest ({digest['symbols']} coins)",
+            f"Top gainers 24h: {movers(digest['gainers'])}",
+            f"Top losers 24h: {movers(digest['losers'])}",
+            f"Overbought (RSI14 >= {RSI_OVERBOUGHT}): {rsi(digest['overbought'])}",
+            f"Oversold (RSI14 <= {RSI_OVERSOLD}): {rsi(digest['oversold'])}",
+            f"Signals this candle: {', '.join(digest['signals']) or 'none'}",
+        ]
+        return "\n".join(lines)
+
+    def llm_summary(self, text):
+        client = self.client if self.client is not None else get_openai_client()
+        completion = chat_completion(
+            client,
+            "market.summary",
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a crypto market analyst. Summarize this hourly market digest in 2-3 plain "
+                               "text lines for traders. Do not use markdown and do not invent numbers.",
+                },
+                {"role": "user", "content": text},
+            ],
+        )
+        return completion.choices[0].message.content.strip()
+
+    def update(self, sent_signals=None):
+        """Add the signals sent since the last update and rebuild the digest for the newest candle.
+
+        Signals accumulate per candle, so a later update for the same candle (a late symbol)
+        keeps the earlier ones. Returns the rendered text.
+        """
+        self.add_signals(sent_signals)
+        digest = self.build()
+        if digest["open_time"] is None:
+            return None
+        # Signals of older candles are no longer shown
+        self.signals = {open_time: texts for open_time, texts in self.signals.items() if open_time >= digest["open_time"]}
+
+        text = self.render(digest)
+        # One LLM summary per candle; symbols arriving late for the same candle only refresh the numbers
+        summary = self.summary if digest["open_time"] == self.open_time else None
+        if self.summarize and summary is not None:
+            LLM_METRICS.cache_hit("market.summary")
+        if self.summarize and summary is None:
+            try:
+                summary = self.llm_summary(text)
+            except Exception as e:
+                print(f"Error summarizing market digest: {e}")
+        if summary:
+            text += "\n\n" + summary
+
+        with self.lock:
+            self.text = text
+            self.open_time = digest["open_time"]
+            self.summary = summary
+        return text
+
+    def latest(self):
+        with self.lock:
+            return self.text
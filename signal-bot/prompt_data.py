@@ -0,0 +1,88 @@
+"""
+Compact market data for LLM prompts.
+
+Candles are written as a small CSV with only the columns the analysis needs,
+numbers rounded to a few significant digits and times shortened, preceded by a
+one-line summary (change, trend, RSI regime, range) so the model does not have
+to derive them from the rows.
+"""
+from datetime import datetime, timedelta, timezone
+
+# Prompt times are shown in GMT+7
+PROMPT_TIMEZONE = timezone(timedelta(hours=7))
+
+CANDLE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume", "rsi7"]
+SIGNIFICANT_DIGITS = 5
+
+
+def is_missing(value):
+    # NaN is the only value not equal to itself; avoids importing numpy for the check
+    return value is None or value != value
+
+
+def format_number(value, digits=SIGNIFICANT_DIGITS):
+    if is_missing(value):
+        return ""
+    value = float(value)
+    # Large values (volumes) as plain integers rather than exponent notation
+    return f"{value:.0f}" if abs(value) >= 10 ** digits else f"{value:.{digits}g}"
+
+
+def format_time(open_time, timeframe="1h"):
+    moment = datetime.fromtimestamp(int(open_time), tz=PROMPT_TIMEZONE)
+    return f"{moment:%m-%d %H:%M}" if timeframe in ("1h", "4h") else f"{moment:%Y-%m-%d}"
+
+
+def candles_csv(candles, columns=CANDLE_COLUMNS, timeframe="1h"):
+    """Oldest-first CSV of the given columns (those present), rounded"""
+    columns = [column for column in columns if column in candles]
+    lines = [",".join("time" if column == "open_time" else column for column in columns)]
+    for row in candles[columns].itertuples(index=False):
+        lines.append(",".join(
+            format_time(value, timeframe) if column == "open_time" else format_number(value)
+            for column, value in zip(columns, row)
+        ))
+    return "\n".join(lines)
+
+
+def rsi_regime(value):
+    if value >= 70:
+        return "overbought"
+    if value <= 30:
+        return "oversold"
+    return "neutral"
+
+
+def summarize_candles(candles, indicators=None):
+    """One-line summary of oldest-first candles plus the latest locally computed indicators"""
+    indicators = indicators or {}
+    close = candles["close"].to_numpy(dtype=float)
+    high = candles["high"].to_numpy(dtype=float)
+    low = candles["low"].to_numpy(dtype=float)
+    last = close[-1]
+
+    parts = [f"last={format_number(last)}", f"change={(last / close[0] - 1) * 100:+.2f}%"]
+
+    ema, sma = indicators.get("ema20"), indicators.get("sma50")
+    if not is_missing(ema) and not is_missing(sma):
+        trend = "up" if last > ema > sma else "down" if last < ema < sma else "sideways"
+        parts.append(f"trend={trend} (ema20={format_number(ema)}, sma50={format_number(sma)})")
+    elif len(close) > 1:
+        import numpy as np
+
+        slope = np.polyfit(np.arange(len(close)), close, 1)[0] / last * 100
+        parts.append(f"trend={'up' if slope > 0.05 else 'down' if slope < -0.05 else 'sideways'}")
+
+    rsi_name, rsi = "rsi14", indicators.get("rsi14")
+    if is_missing(rsi) and "rsi7" in candles and candles["rsi7"].iloc[-1] is not None:
+        rsi_name, rsi = "rsi7", float(candles["rsi7"].iloc[-1])
+    if not is_missing(rsi):
+        parts.append(f"{rsi_name}={format_number(rsi, 3)} {rsi_regime(rsi)}")
+
+    parts.append(f"high={format_number(high.max())}")
+    parts.append(f"low={format_number(low.min())}")
+    if not is_missing(indicators.get("atr14")):
+        parts.append(f"atr14={format_number(indicators['atr14'])}")
+    if not is_missing(indicators.get("bb_upper")):
+        parts.append(f"bollinger={format_number(indicators['bb_lower'])}-{format_number(indicators['bb_upper'])}")
+    return ", ".join(parts)
@@ -0,0 +1,127 @@
+"""
+Higher timeframe candles derived from the 1h candle store.
+
+4h, 1d and 1w candles (with indicators from indicators.py) are aggregated in
+memory from the hourly rows, so no extra tables or queries are needed. Each
+(symbol, timeframe) result is cached and extended incrementally: only the last,
+possibly still forming, bucket is rebuilt when new hourly candles arrive.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_indicators, rsi
+
+BASE_SECONDS = 3600
+
+TIMEFRAMES = {
+    "1h": 3600,
+    "4h": 4 * 3600,
+    "1d": 86400,
+    "1w": 7 * 86400,
+}
+
+# Weeks start on Monday 00:00 UTC (1970-01-01 was a Thursday)
+BUCKET_OFFSETS = {"1w": 4 * 86400}
+
+# Aggregation of the OHLCV columns; any other column of the hourly table is dropped
+AGGREGATIONS = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+
+def bucket_start(open_time, timeframe):
+    """Start (unix seconds) of the timeframe bucket each open_time falls into"""
+    seconds = TIMEFRAMES[timeframe]
+    offset = BUCKET_OFFSETS.get(timeframe, 0)
+    open_time = np.asarray(open_time, dtype=np.int64)
+    return (open_time - offset) // seconds * seconds + offset
+
+
+def resample_candles(df, timeframe, trim_start=False):
+    """Aggregate one symbol's hourly candles (sorted by open_time) into `timeframe` candles.
+
+    The result has open_time (bucket start), symbol, OHLC(V), the number of hourly candles
+    and a `closed` flag, False for the last bucket while it is still forming. With `trim_start`
+    a first bucket that begins before the hourly history does is dropped.
+    """
+    columns = {name: how for name, how in AGGREGATIONS.items() if name in df}
+    if df.empty:
+        return pd.DataFrame(columns=["open_time", "symbol", *columns, "candles", "closed"])
+
+    buckets = bucket_start(df["open_time"], timeframe)
+    values = df[list(columns)].astype(float)
+    grouped = values.groupby(buckets, sort=False)
+    candles = grouped.agg(columns)
+    candles["candles"] = grouped.size()
+    candles = candles.rename_axis("open_time").reset_index()
+    candles.insert(1, "symbol", df["symbol"].iloc[0])
+
+    # Buckets end at the next bucket start; the last one is closed only when its final hour has closed
+    last_close_time = int(df["open_time"].iloc[-1]) + BASE_SECONDS
+    candles["closed"] = candles["open_time"] + TIMEFRAMES[timeframe] <= last_close_time
+    if trim_start and int(df["open_time"].iloc[0]) > candles["open_time"].iloc[0]:
+        # History starts mid-bucket, so the first bucket is missing hours
+        candles = candles.iloc[1:].reset_index(drop=True)
+    return candles
+
+
+def with_indicators(candles):
+    """Resampled candles with locally computed indicators, including the rsi7 the detectors read"""
+    candles = add_indicators(candles)
+    candles["rsi7"] = rsi(candles["close"].to_numpy(dtype=float), 7)
+    return candles
+
+
+def resample_history(df, timeframe):
+    """Closed `timeframe` candles with indicators for a multi-symbol table sorted by symbol, open_time"""
+    frames = []
+    for _, candles in df.groupby("symbol", sort=False):
+        candles = resample_candles(candles, timeframe, trim_start=True)
+        frames.append(with_indicators(candles[candles["closed"]]))
+    return pd.concat(frames, ignore_index=True) if frames else df.iloc[:0]
+
+
+class Resampler:
+    """Per-(symbol, timeframe) cache of resampled candles backed by a CandleStore"""
+
+    def __init__(self, store, max_candles=500):
+        self.store = store
+        self.max_candles = max_candles
+        self.cache = {}  # (symbol, timeframe) -> (last hourly open_time used, candles with indicators)
+        self.lock = threading.Lock()
+
+    def candles(self, symbol, timeframe, n=None, closed_only=False):
+        """Last n `timeframe` candles of a symbol with indicators, oldest first, or None if not cached"""
+        with self.lock:
+            candles = self.extend(symbol, timeframe)
+        if candles is None:
+            return None
+        if closed_only:
+            candles = candles[candles["closed"]]
+        return candles.iloc[-n:].reset_index(drop=True) if n else candles
+
+    def extend(self, symbol, timeframe):
+        last_open_time = self.store.last_open_time(symbol)
+        if last_open_time is None:
+            return None
+
+        cached = self.cache.get((symbol, timeframe))
+        if cached is not None and cached[0] == last_open_time:
+            return cached[1]
+
+        if cached is None:
+            kept = None
+            hourly = self.store.since(symbol, None)
+        else:
+            # Rebuild the last (possibly partial) bucket together with the hourly candles after it
+            previous = cached[1]
+            kept = previous.iloc[:-1]
+            hourly = self.store.since(symbol, int(previous["open_time"].iloc[-1]))
+
+        candles = resample_candles(hourly, timeframe, trim_start=kept is None)
+        if kept is not None and len(kept):
+            candles = pd.concat([kept[candles.columns], candles], ignore_index=True)
+        candles = with_indicators(candles.iloc[-self.max_candles:].reset_index(drop=True))
+
+        self.cache[(symbol, timeframe)] = (last_open_time, candles)
+        return candles
@@ -0,0 +1,147 @@
+"""
+Persistent history of the signals sent to Telegram.
+
+Every detection is written once to the signal_history table; the unique key on
+(symbol, signal_type, open_time) deduplicates it per candle, so a signal is never
+re-sent after a restart or a repeated check. A signal whose send fails is
+deleted again so the next check retries it. Per-symbol aggregates over the last
+30 days are loaded at startup, recomputed on writes and whenever they are older
+than SUMMARY_MAX_AGE, and served from memory for /stats.
+"""
+import threading
+import time
+
+from sqlalchemy import text
+
+from clients import get_engine
+
+CREATE_TABLE = text("""
+CREATE TABLE IF NOT EXISTS signal_history (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    symbol VARCHAR(20) NOT NULL,
+    signal_type VARCHAR(50) NOT NULL,
+    action VARCHAR(50) NOT NULL,
+    order_type VARCHAR(10) NOT NULL,
+    open_time BIGINT NOT NULL,
+    open DECIMAL(30, 12) NOT NULL,
+    close DECIMAL(30, 12) NOT NULL,
+    created_at BIGINT NOT NULL,
+    UNIQUE KEY uq_signal (symbol, signal_type, open_time),
+    INDEX idx_symbol_time (symbol, open_time)
+)
+""")
+
+INSERT_SIGNAL = text("""
+INSERT IGNORE INTO signal_history (symbol, signal_type, action, order_type, open_time, open, close, created_at)
+VALUES (:symbol, :signal_type, :action, :order_type, :open_time, :open, :close, :created_at)
+""")
+
+DELETE_SIGNAL = text("""
+DELETE FROM signal_history WHERE symbol = :symbol AND signal_type = :signal_type AND open_time = :open_time
+""")
+
+RECENT_SIGNALS = text("""
+SELECT symbol, signal_type, action, order_type, open_time, open, close FROM signal_history
+WHERE symbol = :symbol AND open_time >= :since
+ORDER BY open_time DESC
+LIMIT :limit
+""")
+
+SUMMARY_QUERY = text("""
+SELECT symbol, signal_type, order_type, COUNT(*) AS signals, MAX(open_time) AS last_open_time FROM signal_history
+WHERE open_time >= :since
+GROUP BY symbol, signal_type, order_type
+""")
+
+# Window of the /stats aggregates (seconds)
+SUMMARY_WINDOW = 2592000
+# Aggregates older than this are recomputed before being served, so old signals leave the window
+SUMMARY_MAX_AGE = 600
+
+
+class SignalHistory:
+    """signal_history table access plus cached per-symbol aggregates"""
+
+    def __init__(self, engine=None):
+        # None: the shared engine from clients.get_engine(), created on first use
+        self.engine = engine
+        self.summary = {}  # symbol -> [(signal_type, order_type, signals, last_open_time)]
+        self.lock = threading.Lock()
+        self.ready = False
+        self.refreshed_at = None  # time.monotonic() of the last summary refresh
+
+    def db(self):
+        return self.engine if self.engine is not None else get_engine()
+
+    def ensure_table(self):
+        if self.ready:
+            return
+        with self.db().begin() as connection:
+            connection.execute(CREATE_TABLE)
+        self.ready = True
+        self.refresh_summary()
+
+    def record(self, signals):
+        """Store live signals (dicts from scan_candles) and return only the ones not seen before"""
+        self.ensure_table()
+        created_at = int(time.time())
+        new_signals = []
+        with self.db().begin() as connection:
+            for signal in signals:
+                candle = signal['candle']
+                result = connection.execute(INSERT_SIGNAL, {
+                    "symbol": candle['symbol'],
+                    "signal_type": signal['pattern'],
+                    "action": signal['action'],
+                    "order_type": signal['order'],
+                    "open_time": int(candle['open_time']),
+                    "open": float(candle['open']),
+                    "close": float(candle['close']),
+                    "created_at": created_at,
+                })
+                if result.rowcount:
+                    new_signals.append(signal)
+        if new_signals:
+            self.refresh_summary()
+        return new_signals
+
+    def forget(self, signal):
+        """Delete a recorded signal that could not be sent, so the next record() of it counts as new"""
+        candle = signal['candle']
+        with self.db().begin() as connection:
+            connection.execute(DELETE_SIGNAL, {
+                "symbol": candle['symbol'],
+                "signal_type": signal['pattern'],
+                "open_time": int(candle['open_time']),
+            })
+        self.refresh_summary()
+
+    def refresh_summary(self):
+        summary = {}
+        with self.db().connect() as connection:
+            rows = connection.execute(SUMMARY_QUERY, {"since": int(time.time()) - SUMMARY_WINDOW}).fetchall()
+        for symbol, signal_type, order_type, signals, last_open_time in rows:
+            summary.setdefault(symbol, []).append((signal_type, order_type, int(signals), int(last_open_time)))
+        with self.lock:
+            self.summary = summary
+            self.refreshed_at = time.monotonic()
+
+    def refresh_if_stale(self, max_age=SUMMARY_MAX_AGE):
+        """Load the aggregates (creating the table) or recompute them when older than `max_age` seconds"""
+        self.ensure_table()
+        if self.refreshed_at is None or time.monotonic() - self.refreshed_at > max_age:
+            self.refresh_summary()
+
+    def recent(self, symbol, seconds, limit=20):
+        """Signals of a symbol over the last `seconds`, newest first"""
+        self.ensure_table()
+        with self.db().connect() as connection:
+            return connection.execute(RECENT_SIGNALS, {
+                "symbol": symbol,
+                "since": int(time.time()) - seconds,
+                "limit": limit,
+            }).fetchall()
+
+    def symbol_summary(self, symbol):
+        with self.lock:
+            return list(self.summary.get(symbol, []))
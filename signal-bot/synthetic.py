@@ -0,0 +1,26 @@
+"""
+Reproducible synthetic hourly candles shared by benchmark.py and candle_fixture.py.
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import rsi
+
+
+def make_candles(n, seed=0, symbol="SYNTHUSDT"):
+    """Random-walk hourly candles with rsi7, identical for the same (n, seed)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.002, n))
+    high = np.maximum(open_, close) * (1 + rng.exponential(0.004, n))
+    low = np.minimum(open_, close) * (1 - rng.exponential(0.004, n))
+    return pd.DataFrame({
+        "symbol": symbol,
+        "open_time": 1577836800 + np.arange(n, dtype=np.int64) * 3600,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": rng.exponential(1000, n),
+        "rsi7": rsi(close, 7),
+    })
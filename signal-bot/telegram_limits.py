@@ -0,0 +1,86 @@
+"""
+Telegram flood control.
+
+Telegram allows a bot about 30 messages per second overall and rejects bursts
+with RetryAfter, telling the bot how many seconds to wait. Every send and edit
+takes a token from TELEGRAM_LIMITER, a token bucket shared by all chats, so
+concurrent streamed replies and signals stay under the limit together: messages
+that must arrive wait for a token, optional ones (progress edits of a streamed
+reply) are skipped when none is free. with_retry() also waits out a RetryAfter
+and sends again, a bounded number of times, so a burst is delayed, not lost.
+"""
+import os
+import time
+import asyncio
+
+from dotenv import load_dotenv
+from telegram.error import RetryAfter
+
+load_dotenv()
+
+# Attempts after the first one when Telegram answers RetryAfter
+TELEGRAM_SEND_RETRIES = int(os.getenv("TELEGRAM_SEND_RETRIES", 3))
+# Sends and edits per second across all chats, below Telegram's ~30; 0 disables the limiter
+TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv("TELEGRAM_MESSAGES_PER_SECOND", 25))
+
+
+class RateLimiter:
+    """Token bucket of `rate` messages per second, holding up to one second's worth"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Take a token if one is free and nobody is waiting for one; False means skip the optional message"""
+        if not self.rate:
+            return True
+        if self.lock.locked():
+            return False
+        self.refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self):
+        """Wait for a token"""
+        if not self.rate:
+            return
+        async with self.lock:
+            self.refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+TELEGRAM_LIMITER = RateLimiter(TELEGRAM_MESSAGES_PER_SECOND)
+
+
+def retry_after_seconds(error):
+    """Seconds to wait from a RetryAfter (an int or a timedelta depending on the library settings)"""
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+async def with_retry(send, retries=TELEGRAM_SEND_RETRIES, limiter=TELEGRAM_LIMITER):
+    """await send() once the limiter allows it, waiting and calling it again after each RetryAfter, up to `retries` times"""
+    for attempt in range(retries + 1):
+        await limiter.acquire()
+        try:
+            return await send()
+        except RetryAfter as e:
+            if attempt == retries:
+                raise
+            delay = retry_after_seconds(e)
+            print(f"Telegram flood control, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
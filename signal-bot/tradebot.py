@@ -4,260 +4,158 @@ import pandas as pd
 import asyncio
 from telegram import Bot
 from datetime import datetime
+from detectors import HORIZONS, PATTERNS, pattern_lookback, scan_candles
+from forward_returns import signal_stats
+
 
 class TradeBot:
-    def __init__(self, telegram_token, chat_id):
+    def __init__(self, telegram_token, chat_id, win_rate_window=2592000, horizons=HORIZONS):
         self.bot = Bot(token=telegram_token)
         self.chat_id = chat_id
-        self.outside_bar_results = {'win_rates': {}, 'total_signals': 0, 'signals': pd.DataFrame()}
-        self.fourth_signal_results = {'win_rates': {}, 'total_signals': 0, 'signals': pd.DataFrame()}
-        
-    def detect_outside_bar(self, df):
-        """ Detect Outside Bar signal and determine BUY/SELL """
-        if len(df) < 2:
-            return None, None
-            
-        prev_candle = df.iloc[-2]
-        current_candle = df.iloc[-1]
-        
-        is_outside_bar = (current_candle["high"] > prev_candle["high"]) and \
-                         (current_candle["low"] < prev_candle["low"])
-                         
-        if is_outside_bar:
-            if (current_candle["close"] > current_candle["open"]) and (prev_candle["close"] < prev_candle["open"]):
-                return "BULLISH", current_candle  # Bullish Outside Bar -> BUY
-            elif (current_candle["close"] < current_candle["open"]) and (prev_candle["close"] > prev_candle["open"]):
-                return "BEARISH", current_candle  # Bearish Outside Bar -> SELL
-                
-        return None, None
-        
-    def detect_fourth_signal(self, df):
-        """ Detect fourth signal and wash-out signal """
-        if len(df) < 3:
-            return None, None, None
-            
-        candle3 = df.iloc[-3]
-        candle2 = df.iloc[-2]
-        candle1 = df.iloc[-1]
-        
-        all_green = (
-            candle1["open"] < candle1["close"] and
-            candle2["open"] < candle2["close"] and
-            candle3["open"] < candle3["close"]
-        )
-        
-        all_rsi_above = (
-            candle1["rsi7"] > 70 and
-            candle2["rsi7"] > 70 and
-            candle3["rsi7"] > 70
-        )
-        
-        all_red = (
-            candle1["open"] > candle1["close"] and
-            candle2["open"] > candle2["close"] and
-            candle3["open"] > candle3["close"]
-        )
-        
-        all_rsi_below = (
-            candle1["rsi7"] < 30 and
-            candle2["rsi7"] < 30 and
-            candle3["rsi7"] < 30
-        )
-        
-        if all_green and all_rsi_above:
-            return "Fourth Distribution Signal", candle1, "SELL"
-        if all_red and all_rsi_below:
-            return "Wash-out Signal", candle1, "BUY"
-            
-        return None, None, None
-    
-    def collect_outside_bar_signals(self, df):
-        """Collect all outside bar signals from historical data with profits after 1, 2, 4, and 6 candles"""
-        signals = []
-        
-        for i in range(1, len(df) - 6):
-            prev_candle = df.iloc[i-1]
-            current_candle = df.iloc[i]
-            
-            # Get future candles for profit calculation
-            next_candle_1 = df.iloc[i+1]
-            next_candle_2 = df.iloc[i+2]
-            next_candle_4 = df.iloc[i+4]
-            next_candle_6 = df.iloc[i+6]
-            
-            is_outside_bar = (current_candle["high"] > prev_candle["high"]) and \
-                             (current_candle["low"] < prev_candle["low"])
-                             
-            if is_outside_bar:
-                signal_data = {
-                    "time": current_candle["open_time"],
-                    "symbol": current_candle["symbol"],
-                    "entry_price": next_candle_1["open"],  # Entry price is next candle's open
-                    "signal_type": "Outside Bar"
-                }
-                
-                if (current_candle["close"] > current_candle["open"]) and (prev_candle["close"] < prev_candle["open"]):
-                    signal_data["order"] = "BUY"
-                    # Calculate profits for different exit times
-                    signal_data["exit_price_1"] = next_candle_1["close"]
-                    signal_data["exit_price_2"] = next_candle_2["close"]
-                    signal_data["exit_price_4"] = next_candle_4["close"]
-                    signal_data["exit_price_6"] = next_candle_6["close"]
-                    
-                    # Calculate profit percentages for BUY
-                    signal_data["profit_1"] = (next_candle_1["close"] - next_candle_1["open"]) / next_candle_1["open"] * 100
-                    signal_data["profit_2"] = (next_candle_2["close"] - next_candle_1["open"]) / next_candle_1["open"] * 100
-                    signal_data["profit_4"] = (next_candle_4["close"] - next_candle_1["open"]) / next_candle_1["open"] * 100
-                    signal_data["profit_6"] = (next_candle_6["close"] - next_candle_1["open"]) / next_candle_1["open"] * 100
-                    
-                    signals.append(signal_data)
-                    
-                elif (current_candle["close"] < current_candle["open"]) and (prev_candle["close"] > prev_candle["open"]):
-                    signal_data["order"] = "SELL"
-                    # Calculate profits for different exit times
-                    signal_data["exit_price_1"] = next_candle_1["close"]
-                    signal_data["exit_price_2"] = next_candle_2["close"]
-                    signal_data["exit_price_4"] = next_candle_4["close"]
-                    signal_data["exit_price_6"] = next_candle_6["close"]
-                    
-                    # Calculate profit percentages for SELL
-                    signal_data["profit_1"] = (next_candle_1["open"] - next_candle_1["close"]) / next_candle_1["open"] * 100
-                    signal_data["profit_2"] = (next_candle_1["open"] - next_candle_2["close"]) / next_candle_1["open"] * 100
-                    signal_data["profit_4"] = (next_candle_1["open"] - next_candle_4["close"]) / next_candle_1["open"] * 100
-                    signal_data["profit_6"] = (next_candle_1["open"] - next_candle_6["close"]) / next_candle_1["open"] * 100
-                    
-                    signals.append(signal_data)
-        
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
-    
-    def collect_fourth_signals(self, df):
-        """Collect all fourth signals from historical data with profits after 1, 2, 4, and 6 candles"""
-        signals = []
-
-        for i in range(3, len(df) - 6):  
-            candle3 = df.iloc[i-3]
-            candle2 = df.iloc[i-2]
-            candle1 = df.iloc[i-1]
-            signal_candle = df.iloc[i]
-            
-            # Get future candles for profit calculation
-            next_candle_1 = df.iloc[i+1]
-            next_candle_2 = df.iloc[i+2]
-            next_candle_4 = df.iloc[i+4]
-            next_candle_6 = df.iloc[i+6]
-            
-            all_green = (
-                candle1["open"] < candle1["close"] and
-                candle2["open"] < candle2["close"] and
-                candle3["open"] < candle3["close"]
-            )
-            
-            all_rsi_above = (
-                candle1["rsi7"] > 70 and
-                candle2["rsi7"] > 70 and
-                candle3["rsi7"] > 70 
-            )
-            
-            all_red = (
-                candle1["open"] > candle1["close"] and
-                candle2["open"] > candle2["close"] and
-                candle3["open"] > candle3["close"]
-            )
-            
-            all_rsi_below = (
-                candle1["rsi7"] < 30 and
-                candle2["rsi7"] < 30 and
-                candle3["rsi7"] < 30
-            )
+        self.horizons = list(horizons)
+        # Per-symbol results shaped like analyze_historical_performance: {symbol: {'Outside Bar': ..., 'Fourth Signal': ...}}
+        self.results = {}
 
-            signal_data = {
-                "time": signal_candle["open_time"],
-                "symbol": signal_candle["symbol"],
-                "entry_price": signal_candle["open"],
-                "exit_price_1": next_candle_1["close"],
-                "exit_price_2": next_candle_2["close"],
-                "exit_price_4": next_candle_4["close"],
-                "exit_price_6": next_candle_6["close"],
-            }
-
-            if all_green and all_rsi_above:
-                signal_data["order"] = "SELL"
-                signal_data["signal_type"] = "Fourth Distribution"
-                
-                # Calculate profit percentages for SELL
-                signal_data["profit_1"] = (signal_candle["open"] - next_candle_1["close"]) / signal_candle["open"] * 100
-                signal_data["profit_2"] = (signal_candle["open"] - next_candle_2["close"]) / signal_candle["open"] * 100
-                signal_data["profit_4"] = (signal_candle["open"] - next_candle_4["close"]) / signal_candle["open"] * 100
-                signal_data["profit_6"] = (signal_candle["open"] - next_candle_6["close"]) / signal_candle["open"] * 100
-                
-                signals.append(signal_data)
-                
-            if all_red and all_rsi_below:
-                signal_data["order"] = "BUY"
-                signal_data["signal_type"] = "Wash-out"
-                
-                # Calculate profit percentages for BUY
-                signal_data["profit_1"] = (next_candle_1["close"] - signal_candle["open"]) / signal_candle["open"] * 100
-                signal_data["profit_2"] = (next_candle_2["close"] - signal_candle["open"]) / signal_candle["open"] * 100
-                signal_data["profit_4"] = (next_candle_4["close"] - signal_candle["open"]) / signal_candle["open"] * 100
-                signal_data["profit_6"] = (next_candle_6["close"] - signal_candle["open"]) / signal_candle["open"] * 100
-                
-                signals.append(signal_data)
-
-        return pd.DataFrame(signals) if signals else pd.DataFrame()
-    
+        # Per-symbol rolling win-rate state (window in seconds, default last 30 days)
+        self.win_rate_window = win_rate_window
+        self.rolling_state = {}
+        
     def calculate_win_rates_by_candle(self, signals_df):
-        """Calculate win rates for each candle timeframe (1, 2, 4, 6)"""
+        """Calculate win rates for each candle horizon in self.horizons"""
         if signals_df.empty:
-            return {1: 0, 2: 0, 4: 0, 6: 0}, 0
+            return {horizon: 0 for horizon in self.horizons}, 0
             
         total_trades = len(signals_df)
-        win_rates = {}
-        
-        # Calculate win rate for each timeframe
-        for candle_num in [1, 2, 4, 6]:
-            profit_col = f"profit_{candle_num}"
-            profitable_trades = (signals_df[profit_col] > 0).sum()
-            win_rates[candle_num] = profitable_trades / total_trades if total_trades > 0 else 0
+        profit_columns = [f"profit_{horizon}" for horizon in self.horizons]
+        win_rates = (signals_df[profit_columns] > 0).mean().to_numpy()
             
-        return win_rates, total_trades
+        return dict(zip(self.horizons, win_rates)), total_trades
     
     def analyze_historical_performance(self, df):
-        """Analyze historical performance of both strategies with multiple timeframes"""
+        """Analyze historical performance of every registered pattern with multiple timeframes"""
         # Make sure datetime is proper format
         if isinstance(df['open_time'].iloc[0], (int, float)):
             df['open_time'] = pd.to_datetime(df['open_time'], unit='s')
         
-        # Collect signals
-        outside_signals = self.collect_outside_bar_signals(df)
-        fourth_signals = self.collect_fourth_signals(df)
-        
-        # Calculate win rates for each timeframe
-        outside_win_rates, outside_total = self.calculate_win_rates_by_candle(outside_signals)
-        fourth_win_rates, fourth_total = self.calculate_win_rates_by_candle(fourth_signals)
+        # Collect signals of every registered pattern in one pass
+        _, history = scan_candles(df, horizons=self.horizons)
         
-        return {
-            'Outside Bar': {
-                'win_rates': outside_win_rates,
-                'total_signals': outside_total,
-                'signals': outside_signals
-            },
-            'Fourth Signal': {
-                'win_rates': fourth_win_rates,
-                'total_signals': fourth_total,
-                'signals': fourth_signals
+        results = {}
+        for name in PATTERNS:
+            signals = history[history["pattern"] == name].reset_index(drop=True)
+            win_rates, total = self.calculate_win_rates_by_candle(signals)
+            results[name] = {
+                'win_rates': win_rates,
+                'total_signals': total,
+                'signals': signals,
+                'stats': signal_stats(signals, self.horizons)
             }
-        }
+        return results
     
-    async def send_trade_signal(self, action, candle, signal_type=None):
+    def update_rolling_results(self, results, new_signals, cutoff):
+        """Add newly resolved signals to a results dict and expire signals older than cutoff"""
+        signals = results.get('signals', pd.DataFrame())
+        wins = results.get('wins', np.zeros(len(self.horizons), dtype=int))
+        total = results.get('total_signals', 0)
+        profit_columns = [f"profit_{horizon}" for horizon in self.horizons]
+
+        if not new_signals.empty:
+            signals = pd.concat([signals, new_signals], ignore_index=True) if not signals.empty else new_signals
+            total += len(new_signals)
+            wins = wins + (new_signals[profit_columns] > 0).sum().to_numpy()
+
+        if not signals.empty:
+            expired = signals["time"] <= cutoff
+            if expired.any():
+                total -= int(expired.sum())
+                wins = wins - (signals.loc[expired, profit_columns] > 0).sum().to_numpy()
+                signals = signals.loc[~expired].reset_index(drop=True)
+
+        return {
+            'win_rates': dict(zip(self.horizons, wins / total if total > 0 else np.zeros(len(wins)))),
+            'total_signals': total,
+            'signals': signals,
+            'wins': wins,
+        }
+
+    def update_historical_performance(self, new_candles):
+        """Fold new candles of any number of symbols into their rolling win rates
+
+        Returns {symbol: live signals} for the symbols that received candles newer than their
+        last_open_time; live signals are patterns completed on the newest candle.
+        """
+        updated = {}
+        if new_candles.empty:
+            return updated
+
+        for symbol, candles in new_candles.groupby("symbol", sort=False):
+            live_signals = self.update_symbol_performance(symbol, candles)
+            if live_signals is not None:
+                updated[symbol] = live_signals
+        return updated
+
+    def oldest_open_time(self, symbols):
+        """Oldest last_open_time across the symbols that have state, or None if none has any
+
+        Symbols without state (no rows yet, a typo, a delisted pair) are left out so they do not
+        force every incremental query back to the full history.
+        """
+        times = [self.rolling_state.get(symbol, {}).get('last_open_time') for symbol in symbols]
+        times = [t for t in times if t is not None]
+        return min(times) if times else None
+
+    def update_symbol_performance(self, symbol, new_candles):
+        """Fold candles newer than the symbol's last_open_time into the rolling win rates of every pattern
+
+        Only the last few candles are kept between calls, so each update costs O(new candles).
+        Signals are counted once all their exit candles are known and expire after win_rate_window.
+        Returns the live signals on the newest candle, or None if there were no new candles.
+        """
+        state = self.rolling_state.setdefault(symbol, {
+            'candle_tail': pd.DataFrame(),
+            'last_open_time': None,
+            'last_evaluated_time': None,
+        })
+        results = self.results.setdefault(symbol, {name: {} for name in PATTERNS})
+
+        if state['last_open_time'] is not None:
+            new_candles = new_candles[new_candles["open_time"] > state['last_open_time']]
+        if new_candles.empty:
+            return None
+
+        if state['candle_tail'].empty:
+            candles = new_candles.reset_index(drop=True)
+        else:
+            candles = pd.concat([state['candle_tail'], new_candles], ignore_index=True)
+
+        live_signals, history = scan_candles(candles, horizons=self.horizons)
+
+        # Candles up to len - 1 - max horizon now have all their exit prices; skip the ones counted last time
+        max_horizon = max(self.horizons)
+        if state['last_evaluated_time'] is not None:
+            history = history[history["time"] > state['last_evaluated_time']]
+        if len(candles) > max_horizon:
+            state['last_evaluated_time'] = candles["open_time"].iloc[-1 - max_horizon]
+
+        state['last_open_time'] = candles["open_time"].iloc[-1]
+        # Besides the forward horizon, keep the longest lookback (plus signal offset) of any registered pattern
+        state['candle_tail'] = candles.iloc[-(max_horizon + pattern_lookback()):].reset_index(drop=True)
+
+        cutoff = state['last_open_time'] - self.win_rate_window
+        for name in PATTERNS:
+            new_signals = history[history["pattern"] == name]
+            results[name] = self.update_rolling_results(results.get(name, {}), new_signals, cutoff)
+        return live_signals
+
+    async def send_trade_signal(self, action, candle, signal_type=None, order_type=None):
         """Send trade signal via Telegram with win rate information for different timeframes"""
         if action:
-            # Determine order type
-            order_type = None
-            if action == "BULLISH" or action == "Wash-out Signal":
-                order_type = "BUY"
-            elif action == "BEARISH" or action == "Fourth Distribution Signal":
-                order_type = "SELL"
+            # Determine order type when the detector did not provide it
+            if order_type is None:
+                if action == "BULLISH" or action == "Wash-out Signal":
+                    order_type = "BUY"
+                elif action == "BEARISH" or action == "Fourth Distribution Signal":
+                    order_type = "SELL"
             
             message = (
                 f"Token: {candle['symbol']}\n"
@@ -274,20 +172,11 @@ class TradeBot:
                 "***"
             )
 
-            if signal_type == "Outside Bar":
-                win_rates = self.outside_bar_results.get('win_rates', {})
-                message += "Historical Win Rates of Last 30 days:\n"
-                message += f"- 1 Session: {win_rates.get(1, 0):.2%}\n"
-                message += f"- 2 Sessions: {win_rates.get(2, 0):.2%}\n"
-                message += f"- 4 Sessions: {win_rates.get(4, 0):.2%}\n"
-                message += f"- 6 Sessions: {win_rates.get(6, 0):.2%}\n"
-            elif signal_type == "Fourth Signal":
-                win_rates = self.fourth_signal_results.get('win_rates', {})
+            if signal_type in PATTERNS:
+                win_rates = self.results.get(candle['symbol'], {}).get(signal_type, {}).get('win_rates', {})
                 message += "Historical Win Rates of Last 30 days:\n"
-                message += f"- 1 Session: {win_rates.get(1, 0):.2%}\n"
-                message += f"- 2 Sessions: {win_rates.get(2, 0):.2%}\n"
-                message += f"- 4 Sessions: {win_rates.get(4, 0):.2%}\n"
-                message += f"- 6 Sessions: {win_rates.get(6, 0):.2%}\n"
+                for horizon in self.horizons:
+                    message += f"- {horizon} Session{'s' if horizon > 1 else ''}: {win_rates.get(horizon, 0):.2%}\n"
             
             
             await self.bot.send_message(chat_id=self.chat_id, text=message)
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Load-test harness for the wallet tracker poller.
+
+Seeds a throwaway tracker DB with synthetic subscriptions, serves a fake
+Blockfrost API on localhost with heavy-tailed wallet activity, stubs the
+Telegram bot and drives check_tracked_addresses() for a fixed duration.
+
+Usage:
+    python load_test.py --addresses 10000 --duration 300
+"""
+import os
+import re
+import math
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeBlockfrost:
+    """In-memory Blockfrost stand-in serving /addresses/{addr}/transactions and /txs/{hash}"""
+
+    def __init__(self, addresses, tx_per_hour, seed=0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.history = {address: [] for address in addresses}
+        self.txs = {}
+        self.created_at = {}
+        self.api_calls = defaultdict(int)
+        self.block_height = 10_000_000
+        self.running = False
+
+        # Most wallets are dormant, a few are very busy: draw per-address rates from a lognormal
+        weights = [self.rng.lognormvariate(0, 2) for _ in addresses]
+        scale = tx_per_hour / 3600 / (sum(weights) / len(weights))
+        self.addresses = list(addresses)
+        self.total_rate = sum(weights) * scale
+        self.cum_weights = []
+        running_total = 0
+        for weight in weights:
+            running_total += weight
+            self.cum_weights.append(running_total)
+
+    def add_transaction(self, address, block_time=None):
+        """Append a new transaction to an address history and return its hash"""
+        with self.lock:
+            self.block_height += 1
+            tx_hash = "%064x" % self.rng.getrandbits(256)
+            block_time = int(block_time if block_time is not None else time.time())
+            self.txs[tx_hash] = {
+                "hash": tx_hash,
+                "block": "%064x" % self.rng.getrandbits(256),
+                "block_height": self.block_height,
+                "block_time": block_time,
+                "slot": block_time - 1591566291,
+                "index": 0,
+                "fees": str(self.rng.randint(170000, 900000)),
+                "deposit": "0",
+                "size": self.rng.randint(300, 16000),
+            }
+            self.history[address].append({
+                "tx_hash": tx_hash,
+                "tx_index": 0,
+                "block_height": self.block_height,
+                "block_time": block_time,
+            })
+            self.created_at[tx_hash] = time.time()
+            return tx_hash
+
+    def generate_activity(self):
+        """Emit transactions as a Poisson process until stopped"""
+        while self.running:
+            time.sleep(self.rng.expovariate(self.total_rate))
+            address = self.rng.choices(self.addresses, cum_weights=self.cum_weights)[0]
+            self.add_transaction(address)
+
+    def start(self, host="127.0.0.1", port=0):
+        harness = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                parts = parsed.path.strip("/").split("/")
+                body, status = None, 404
+
+                if len(parts) == 3 and parts[0] == "addresses" and parts[2] == "transactions":
+                    harness.api_calls["addresses/transactions"] += 1
+                    with harness.lock:
+                        history = harness.history.get(parts[1])
+                        if history is not None:
+                            count = int(params.get("count", ["100"])[0])
+                            page = int(params.get("page", ["1"])[0])
+                            order = params.get("order", ["asc"])[0]
+                            rows = history if order == "asc" else history[::-1]
+                            body, status = rows[(page - 1) * count:page * count], 200
+                elif len(parts) == 2 and parts[0] == "txs":
+                    harness.api_calls["txs"] += 1
+                    with harness.lock:
+                        tx = harness.txs.get(parts[1])
+                    if tx is not None:
+                        body, status = tx, 200
+                else:
+                    harness.api_calls["other"] += 1
+
+                payload = json.dumps(body if body is not None else {"status_code": 404, "error": "Not Found"}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.running = True
+        threading.Thread(target=self.generate_activity, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.running = False
+        self.server.shutdown()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the Cardano wallet tracker poller")
+    parser.add_argument("--addresses", type=int, default=10000, help="number of tracked addresses")
+    parser.add_argument("--users", type=int, default=2000, help="number of Telegram users owning them")
+    parser.add_argument("--tx-per-hour", type=float, default=0.5, help="mean transactions per address per hour")
+    parser.add_argument("--duration", type=float, default=120, help="seconds to run the poller")
+    parser.add_argument("--interval", type=float, default=0, help="sleep between sweeps (production uses POLL_INTERVAL)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    addresses = ["addr1q%058x" % rng.getrandbits(232) for _ in range(args.addresses)]
+    fake = FakeBlockfrost(addresses, args.tx_per_hour, seed=args.seed)
+
+    # Every address starts with one already-known transaction
+    seed_time = int(time.time()) - 3600
+    known = {address: fake.add_transaction(address, block_time=seed_time) for address in addresses}
+    fake.created_at.clear()
+
+    # The tracker reads its configuration at import time
+    db_dir = tempfile.mkdtemp(prefix="tracker-load-")
+    os.environ["TRACKER_DB_PATH"] = os.path.join(db_dir, "tracked_cardano_addresses.db")
+    os.environ["BLOCKFROST_API_URL"] = fake.start()
+    os.environ.setdefault("BOT_TOKEN", "000000:LOAD_TEST")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main as tracker
+
+    tracker.DB_CURSOR.executemany('''
+        INSERT OR REPLACE INTO tracked_addresses
+        (user_id, address, label, last_transaction_hash, last_transaction_time)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(rng.randint(1, args.users), address, f"wallet-{i}", known[address], str(seed_time))
+          for i, address in enumerate(addresses)])
+    tracker.DB_CONN.commit()
+
+    alert_latencies = []
+    alerted = set()
+    duplicates = []
+    hash_pattern = re.compile(r"Transaction Hash: ([0-9a-f]+)")
+
+    def send_message(chat_id, text, *args, **kwargs):
+        match = hash_pattern.search(text)
+        if match and match.group(1) in alerted:
+            duplicates.append(match.group(1))
+        elif match and match.group(1) in fake.created_at:
+            alerted.add(match.group(1))
+            alert_latencies.append(time.time() - fake.created_at[match.group(1)])
+
+    tracker.bot.send_message = send_message
+
+    print(f"Seeded {args.addresses} addresses for {args.users} users, "
+          f"~{fake.total_rate * 3600:.0f} tx/hour, running for {args.duration:.0f}s...")
+
+    sweep_times = []
+    started = time.time()
+    while time.time() - started < args.duration:
+        sweep_started = time.time()
+        tracker.check_tracked_addresses()
+        sweep_times.append(time.time() - sweep_started)
+        print(f"Sweep {len(sweep_times)}: {sweep_times[-1]:.2f}s, {len(alerted)} alerts so far")
+        if args.interval:
+            time.sleep(args.interval)
+    elapsed = time.time() - started
+    fake.stop()
+
+    generated = len(fake.created_at)
+    total_calls = sum(fake.api_calls.values())
+    print("\n=== Wallet tracker load test ===")
+    print(f"Addresses: {args.addresses}  Users: {args.users}  Duration: {elapsed:.1f}s")
+    print(f"API calls: {total_calls} ({total_calls / elapsed * 60:.0f}/min)")
+    for endpoint, count in sorted(fake.api_calls.items()):
+        print(f"- {endpoint}: {count} ({count / elapsed * 60:.0f}/min)")
+    print(f"Sweeps: {len(sweep_times)}  p50 {percentile(sweep_times, 50):.2f}s  "
+          f"p95 {percentile(sweep_times, 95):.2f}s  max {max(sweep_times):.2f}s")
+    print(f"Transactions generated: {generated}  alerted: {len(alerted)}  "
+          f"not alerted: {generated - len(alerted)}  duplicate alerts: {len(duplicates)}")
+    print(f"Alert latency: p50 {percentile(alert_latencies, 50):.2f}s  p90 {percentile(alert_latencies, 90):.2f}s  "
+          f"p99 {percentile(alert_latencies, 99):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,15 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 CARDANO_API_KEY = os.getenv('CARDANO_API_KEY')  # API key for Blockfrost 
+BLOCKFROST_API_URL = os.getenv('BLOCKFROST_API_URL', 'https://cardano-mainnet.blockfrost.io/api/v0')
+TRACKER_DB_PATH = os.getenv('TRACKER_DB_PATH', 'tracked_cardano_addresses.db')
+POLL_INTERVAL = int(os.getenv('POLL_INTERVAL', 30))  # seconds between sweeps
 
 bot = telebot.TeleBot(BOT_TOKEN)
 
 def init_database():
     """Initialize SQLite database for tracking addresses"""
-    conn = sqlite3.connect('tracked_cardano_addresses.db', check_same_thread=False)
+    conn = sqlite3.connect(TRACKER_DB_PATH, check_same_thread=False)
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tracked_addresses (
@@ -78,7 +81,7 @@ def add_tracked_address(user_id, address, label=None):
     """Add an address to be tracked by a user with an optional label"""
     try:
        
-        url = f'https://cardano-mainnet.blockfrost.io/api/v0/addresses/{address}/transactions?count=1'
+        url = f'{BLOCKFROST_API_URL}/addresses/{address}/transactions?count=1'
         headers = {
             'project_id': CARDANO_API_KEY
         }
@@ -93,7 +96,7 @@ def add_tracked_address(user_id, address, label=None):
             if transactions:
              
                 tx_hash = transactions[0]['tx_hash']
-                tx_url = f'https://cardano-mainnet.blockfrost.io/api/v0/txs/{tx_hash}'
+                tx_url = f'{BLOCKFROST_API_URL}/txs/{tx_hash}'
                 tx_response = requests.get(tx_url, headers=headers)
                 
                 if tx_response.status_code == 200:
@@ -144,69 +147,70 @@ def remove_tracked_address(user_id, identifier):
         print(f"Error removing tracked address: {e}")
         return False
 
-def check_new_transactions():
-    """Periodically check for new transactions for tracked addresses"""
-    while True:
+def check_tracked_addresses():
+    """Run a single sweep over all tracked addresses and notify users of new transactions"""
+    DB_CURSOR.execute('SELECT DISTINCT user_id, address, label, last_transaction_hash, last_transaction_time FROM tracked_addresses')
+    tracked = DB_CURSOR.fetchall()
+    
+    for user_id, address, label, last_hash, last_time in tracked:
         try:
             
-            DB_CURSOR.execute('SELECT DISTINCT user_id, address, label, last_transaction_hash, last_transaction_time FROM tracked_addresses')
-            tracked = DB_CURSOR.fetchall()
+            url = f'{BLOCKFROST_API_URL}/addresses/{address}/transactions?count=20'
+            headers = {
+                'project_id': CARDANO_API_KEY
+            }
             
-            for user_id, address, label, last_hash, last_time in tracked:
+            response = requests.get(url, headers=headers)
+            
+            if response.status_code == 200:
+                transactions = response.json()
+                
+                
                 try:
                     
-                    url = f'https://cardano-mainnet.blockfrost.io/api/v0/addresses/{address}/transactions?count=20'
-                    headers = {
-                        'project_id': CARDANO_API_KEY
-                    }
-                    
-                    response = requests.get(url, headers=headers)
+                    last_time_dt = datetime.fromisoformat(last_time.replace('Z', '+00:00'))
+                    last_time_timestamp = int(last_time_dt.timestamp())
+                except ValueError:
+                   
+                    last_time_timestamp = int(last_time)
+  
+                for tx_brief in transactions:
+                    tx_hash = tx_brief['tx_hash']
+                   
+                    if tx_hash == last_hash:
+                        continue
+                  
+                    tx_url = f'{BLOCKFROST_API_URL}/txs/{tx_hash}'
+                    tx_response = requests.get(tx_url, headers=headers)
                     
-                    if response.status_code == 200:
-                        transactions = response.json()
-                        
-                        
-                        try:
+                    if tx_response.status_code == 200:
+                        tx_data = tx_response.json()
+                       
+                        if tx_data['block_time'] > last_time_timestamp:
+                         
+                            message, latest_hash = parse_transaction_details(tx_data, label)
                             
-                            last_time_dt = datetime.fromisoformat(last_time.replace('Z', '+00:00'))
-                            last_time_timestamp = int(last_time_dt.timestamp())
-                        except ValueError:
-                           
-                            last_time_timestamp = int(last_time)
-  
-                        for tx_brief in transactions:
-                            tx_hash = tx_brief['tx_hash']
-                           
-                            if tx_hash == last_hash:
-                                continue
                           
-                            tx_url = f'https://cardano-mainnet.blockfrost.io/api/v0/txs/{tx_hash}'
-                            tx_response = requests.get(tx_url, headers=headers)
+                            bot.send_message(user_id, message)
                             
-                            if tx_response.status_code == 200:
-                                tx_data = tx_response.json()
-                               
-                                if tx_data['block_time'] > last_time_timestamp:
-                                 
-                                    message, latest_hash = parse_transaction_details(tx_data, label)
-                                    
-                                  
-                                    bot.send_message(user_id, message)
-                                    
-                                  
-                                    DB_CURSOR.execute('''
-                                        UPDATE tracked_addresses 
-                                        SET last_transaction_hash = ?, 
-                                            last_transaction_time = ? 
-                                        WHERE user_id = ? AND address = ?
-                                    ''', (latest_hash, str(tx_data['block_time']), user_id, address))
-                                    DB_CONN.commit()
-                
-                except Exception as address_error:
-                    print(f"Error checking transactions for {address}: {address_error}")
-            
-            
-            time.sleep(30)
+                          
+                            DB_CURSOR.execute('''
+                                UPDATE tracked_addresses 
+                                SET last_transaction_hash = ?, 
+                                    last_transaction_time = ? 
+                                WHERE user_id = ? AND address = ?
+                            ''', (latest_hash, str(tx_data['block_time']), user_id, address))
+                            DB_CONN.commit()
+        
+        except Exception as address_error:
+            print(f"Error checking transactions for {address}: {address_error}")
+
+def check_new_transactions():
+    """Periodically check for new transactions for tracked addresses"""
+    while True:
+        try:
+            check_tracked_addresses()
+            time.sleep(POLL_INTERVAL)
         
         except Exception as e:
             print(f"Error in transaction checking loop: {e}")
@@ -221,7 +225,7 @@ def get_address_balance(address):
     """
     try:
        
-        url = f'https://cardano-mainnet.blockfrost.io/api/v0/addresses/{address}'
+        url = f'{BLOCKFROST_API_URL}/addresses/{address}'
         headers = {
             'project_id': CARDANO_API_KEY
         }
@@ -276,7 +280,7 @@ def get_address_tokens(address):
     """
     try:
      
-        url = f'https://cardano-mainnet.blockfrost.io/api/v0/addresses/{address}'
+        url = f'{BLOCKFROST_API_URL}/addresses/{address}'
         headers = {
             'project_id': CARDANO_API_KEY
         }
@@ -362,7 +366,7 @@ Stake Address: {stake_address}
                 
                 try:
                    
-                    asset_url = f'https://cardano-mainnet.blockfrost.io/api/v0/assets/{unit}'
+                    asset_url = f'{BLOCKFROST_API_URL}/assets/{unit}'
                     asset_response = requests.get(asset_url, headers=headers)
                     
                     if asset_response.status_code == 200:
@@ -452,7 +456,7 @@ def get_address_nfts(address):
     :return: NFT information or error message
     """
     try:
-        url = f'https://cardano-mainnet.blockfrost.io/api/v0/addresses/{address}/assets'
+        url = f'{BLOCKFROST_API_URL}/addresses/{address}/assets'
         headers = {
             'project_id': CARDANO_API_KEY
         }
@@ -473,7 +477,7 @@ def get_address_nfts(address):
             for asset in assets:
                 try:
                    
-                    asset_url = f'https://cardano-mainnet.blockfrost.io/api/v0/assets/{asset["unit"]}'
+                    asset_url = f'{BLOCKFROST_API_URL}/assets/{asset["unit"]}'
                     asset_response = requests.get(asset_url, headers=headers)
                     
                     if asset_response.status_code == 200: